@@ -22,6 +22,9 @@ RUN mkdir -p /app/geoip && \
 # Copy application
 COPY . .
 
+# Build compiled detection helpers
+RUN cythonize -3 -i detection_cy.pyx
+
 # Create directories
 RUN mkdir -p /app/uploads /app/logs
 
@@ -30,4 +33,4 @@ RUN chmod +x /app/start.sh
 
 EXPOSE 8000
 
-CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000", "--workers", "4"]
+CMD ["gunicorn", "-c", "gunicorn.conf.py", "main:app"]
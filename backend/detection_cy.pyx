@@ -0,0 +1,74 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled per-log pattern checks for DetectionEngine.analyze_logs
+
+Build in place with: cythonize -3 -i detection_cy.pyx
+The engine falls back to DetectionEngine.pattern_alerts when this is not built.
+"""
+from models import AttackType, RawAlert
+
+
+def pattern_alerts(engine, list logs, set alert_seen):
+    """Raw alerts for every log in logs, same as DetectionEngine.pattern_alerts"""
+    cdef list alerts = []
+    cdef list category_alerts = engine.category_alerts
+    cdef tuple admin_paths = tuple(engine.ADMIN_PATHS)
+    cdef tuple sensitive_markers = tuple(engine.SENSITIVE_FILE_MARKERS)
+    cdef unicode endpoint, query_params, user_agent, full_request, endpoint_lower, marker
+    cdef long long matched
+    cdef tuple key
+
+    scan_categories = engine.scan_categories
+    is_suspicious_user_agent = engine.is_suspicious_user_agent
+
+    for log in logs:
+        endpoint = log.endpoint
+        query_params = log.query_params
+        user_agent = log.user_agent
+        client_ip = log.client_ip
+
+        # Combine endpoint and query for pattern matching
+        full_request = endpoint + "?" + query_params if query_params else endpoint
+        endpoint_lower = endpoint.lower()
+
+        matched = scan_categories(full_request.lower())
+
+        # Check SQL injection, XSS, path traversal and common exploits
+        if matched:
+            for bit, attack_type, confidence, details in category_alerts:
+                if matched & bit:
+                    key = (client_ip, attack_type, endpoint)
+                    if key not in alert_seen:
+                        alert_seen.add(key)
+                        alerts.append(RawAlert(log, attack_type, confidence,
+                                               details.format(full_request[:50])))
+
+        # Check for suspicious user agents
+        if user_agent and is_suspicious_user_agent(user_agent):
+            key = (client_ip, AttackType.SCANNING, endpoint)
+            if key not in alert_seen:
+                alert_seen.add(key)
+                alerts.append(RawAlert(log, AttackType.SCANNING, 0.70,
+                                       f"Suspicious user agent: {user_agent[:50]}"))
+
+        # Check for admin access attempts
+        for marker in admin_paths:
+            if marker in endpoint_lower:
+                key = (client_ip, AttackType.SUSPICIOUS_ACTIVITY, endpoint)
+                if key not in alert_seen:
+                    alert_seen.add(key)
+                    alerts.append(RawAlert(log, AttackType.SUSPICIOUS_ACTIVITY, 0.60,
+                                           f"Admin access attempt: {endpoint}"))
+                break
+
+        # Check for sensitive file access
+        for marker in sensitive_markers:
+            if marker in endpoint_lower:
+                key = (client_ip, AttackType.EXPLOIT_ATTEMPT, endpoint)
+                if key not in alert_seen:
+                    alert_seen.add(key)
+                    alerts.append(RawAlert(log, AttackType.EXPLOIT_ATTEMPT, 0.75,
+                                           f"Sensitive file access: {endpoint}"))
+                break
+
+    return alerts
@@ -1,38 +1,133 @@
 """
 Detection Engine - Identify attacks and suspicious patterns - FIXED VERSION
 """
-from typing import List, Dict, Tuple
-from datetime import datetime, timedelta
-from collections import defaultdict
+from typing import List, Dict, Tuple, Optional, Set, Iterable, Iterator, Any
+from datetime import datetime
+from collections import defaultdict, Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+from functools import lru_cache
+from itertools import islice
 import re
-from models import LogEntry, AttackAlert, AttackType
+import numpy as np
+from models import LogEntry, AttackAlert, AttackType, RawAlert
+
+try:
+    import re2  # Linear-time matching, immune to catastrophic backtracking
+except ImportError:
+    re2 = None
+
+try:
+    import hyperscan  # SIMD multi-pattern scanning across all categories at once
+except ImportError:
+    hyperscan = None
+
+try:
+    import ahocorasick  # Single-pass multi-substring search for user agents
+except ImportError:
+    ahocorasick = None
+
+try:
+    import detection_cy  # Cython build of the per-log pattern checks (cythonize -3 -i detection_cy.pyx)
+except ImportError:
+    detection_cy = None
+
+try:
+    import numba
+    from numba import njit, prange  # Native, per-IP parallel sliding windows
+    
+    # The default TBB layer can hang at exit once started from a worker thread, and
+    # uploads run detection on one; set before any kernel is compiled or loaded
+    if "NUMBA_THREADING_LAYER" not in os.environ:
+        numba.config.THREADING_LAYER = "workqueue"
+except ImportError:
+    njit = None
+
+
+def _peak_windows_numpy(timestamps, offsets, lengths, min_requests, threshold, window_us):
+    """Per IP segment of sorted timestamps, the densest window of at least
+    threshold requests at more than 10 requests per second (0 if none)"""
+    peak_counts = np.zeros(len(offsets), dtype=np.int64)
+    peak_rps = np.zeros(len(offsets), dtype=np.float64)
+    
+    for k in np.flatnonzero(lengths >= min_requests):
+        ts = timestamps[offsets[k]:offsets[k] + lengths[k]]
+        starts = np.searchsorted(ts, ts - window_us, side='left')
+        counts = np.arange(1, len(ts) + 1) - starts
+        rps = counts / np.maximum((ts - ts[starts]) / 1_000_000, 1)
+        
+        valid_counts = np.where((counts >= threshold) & (rps > 10), counts, 0)
+        peak = valid_counts.argmax()
+        if valid_counts[peak]:
+            peak_counts[k] = counts[peak]
+            peak_rps[k] = rps[peak]
+    
+    return peak_counts, peak_rps
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _peak_windows_numba(timestamps, offsets, lengths, min_requests, threshold, window_us):
+        """Numba version of _peak_windows_numpy using a two-pointer window"""
+        peak_counts = np.zeros(len(offsets), dtype=np.int64)
+        peak_rps = np.zeros(len(offsets), dtype=np.float64)
+        
+        for k in prange(len(offsets)):
+            if lengths[k] < min_requests:
+                continue
+            
+            base = offsets[k]
+            j = 0
+            for i in range(lengths[k]):
+                ts = timestamps[base + i]
+                while timestamps[base + j] < ts - window_us:
+                    j += 1
+                
+                count = i - j + 1
+                if count >= threshold and count > peak_counts[k]:
+                    rps = count / max((ts - timestamps[base + j]) / 1_000_000, 1.0)
+                    if rps > 10:
+                        peak_counts[k] = count
+                        peak_rps[k] = rps
+        
+        return peak_counts, peak_rps
+else:
+    _peak_windows_numba = None
+
+# The LogEntry fields read by the per-log pattern checks, sent to worker processes
+ScanRecord = namedtuple('ScanRecord', 'index client_ip endpoint query_params user_agent')
+
 
 class DetectionEngine:
     """Detect attacks and suspicious patterns in NGINX logs"""
     
     # Detection patterns
+    # Patterns are lowercase and matched case-sensitively against lowercased
+    # requests. Every repetition is bounded so a crafted request cannot make the
+    # backtracking engine go polynomial on the detector itself
     SQL_INJECTION_PATTERNS = [
         r'union\s+select',
-        r'sleep\s*\(\s*\d+\s*\)',
-        r'benchmark\s*\(.*\)',
-        r'(\%27)|(\')|(\-\-)',
-        r'/\*.*\*/',
-        r'\bor\b.*=.*\bor\b',
-        r'exec\s*\(.*\)',
+        r'sleep\s{0,5}\(\s{0,5}\d{1,10}\s{0,5}\)',
+        r'benchmark\s{0,5}\([^)]{0,200}\)',
+        r'(?:\%27)|(?:\')|(?:\-\-)',
+        r'/\*.{0,200}?\*/',
+        r'\bor\b[^=]{0,100}=.{0,100}?\bor\b',
+        r'exec\s{0,5}\([^)]{0,200}\)',
         r'insert\s+into',
         r'drop\s+table',
-        r'select\s+.*from'
+        r'select\s{1,20}.{0,200}?from'
     ]
     
     XSS_PATTERNS = [
-        r'<script.*?>.*?</script>',
-        r'on\w+\s*=',
+        r'<script[^>]{0,200}>.{0,1000}?</script>',
+        r'on\w{1,30}\s{0,5}=',
         r'javascript:',
         r'vbscript:',
-        r'alert\s*\(.*\)',
+        r'alert\s{0,5}\([^)]{0,200}\)',
         r'document\.\w+',
         r'window\.location',
-        r'eval\s*\(.*\)'
+        r'eval\s{0,5}\([^)]{0,200}\)'
     ]
     
     PATH_TRAVERSAL_PATTERNS = [
@@ -50,107 +145,217 @@ class DetectionEngine:
         r'phpinfo\(\)',
         r'\.env',
         r'\.git/config',
-        r'\.DS_Store',
+        r'\.ds_store',
         r'wp-config\.php',
         r'config\.json',
         r'\.bak$',
         r'\.old$'
     ]
     
+    PATTERN_SOURCES = {
+        "sql_injection": SQL_INJECTION_PATTERNS,
+        "xss": XSS_PATTERNS,
+        "path_traversal": PATH_TRAVERSAL_PATTERNS,
+        "common_exploits": COMMON_EXPLOIT_PATTERNS
+    }
+    
+    # Alert raised for each pattern category: (category, attack type, confidence, details)
+    CATEGORY_ALERTS = (
+        ("sql_injection", AttackType.SQL_INJECTION, 0.85, "SQL injection pattern detected in request: {}"),
+        ("xss", AttackType.XSS, 0.80, "Cross-site scripting pattern detected: {}"),
+        ("path_traversal", AttackType.PATH_TRAVERSAL, 0.90, "Path traversal attempt: {}"),
+        ("common_exploits", AttackType.EXPLOIT_ATTEMPT, 0.75, "Common exploit pattern: {}")
+    )
+    
+    # Literals at least one of which appears in any (lowercased) match of a
+    # category; requests containing none of them skip the regex entirely. A tuple
+    # hint needs all of its literals in that order, for patterns whose literal alone
+    # is common in plain paths ('or' in /orders, 'on' in /session)
+    PATTERN_LITERAL_HINTS = {
+        "sql_injection": ('union', 'sleep', 'benchmark', '%27', "'", '--', '/*', ('or', '=', 'or'),
+                          'exec', 'insert', 'drop', 'select'),
+        "xss": ('<script', ('on', '='), 'javascript:', 'vbscript:', 'alert', 'document.',
+                'window.location', 'eval'),
+        "path_traversal": ('..', 'etc/passwd', 'win.ini', 'boot.ini', '/proc/self/'),
+        "common_exploits": ('phpinfo()', '.env', '.git/config', '.ds_store', 'wp-config.php',
+                            'config.json', '.bak', '.old')
+    }
+    
     BOT_USER_AGENTS = [
         'bot', 'crawler', 'spider', 'scraper', 'curl', 'wget',
         'python-requests', 'java', 'go-http-client', 'node-fetch',
         'apache-httpclient', 'okhttp', 'libwww-perl', 'sqlmap'
     ]
     
+    ADMIN_PATHS = ['/admin', '/wp-admin', '/administrator']
+    
+    SENSITIVE_FILE_MARKERS = ['.env', '.git', 'config.', 'password']
+    
+    BYTE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+    
+    # Response codes counted as failed attempts by the brute-force check
+    BRUTE_FORCE_STATUSES = frozenset({401, 403, 404})
+    
     def __init__(self):
-        self.compiled_patterns = {
-            "sql_injection": [re.compile(p, re.IGNORECASE) for p in self.SQL_INJECTION_PATTERNS],
-            "xss": [re.compile(p, re.IGNORECASE) for p in self.XSS_PATTERNS],
-            "path_traversal": [re.compile(p, re.IGNORECASE) for p in self.PATH_TRAVERSAL_PATTERNS],
-            "common_exploits": [re.compile(p, re.IGNORECASE) for p in self.COMMON_EXPLOIT_PATTERNS]
-        }
+        self.pattern_sources = self.PATTERN_SOURCES
+        
+        # Compiled matchers are built once per process and shared by every engine
+        self.compiled_patterns, self.hs_db, self.bot_automaton = self.compiled_matchers()
+        
+        # Bit i of a scan mask corresponds to pattern_categories[i]
+        self.pattern_categories = list(self.pattern_sources)
+        self.category_alerts = [
+            (self.category_bit(category), attack_type, confidence, details)
+            for category, attack_type, confidence, details in self.CATEGORY_ALERTS
+        ]
+        
+        # Per category: a search for its single literals, a match for its ordered sequences (or None)
+        self.category_hints = [
+            (category, *self.compile_hints(self.PATTERN_LITERAL_HINTS[category]))
+            for category in self.pattern_categories
+        ]
+        
+        # Logs repeat the same few user agents, so remember each verdict
+        self.bot_signature_lookup = lru_cache(maxsize=4096)(self.has_bot_signature)
         
         # Tracking for rate-based detection
         self.ip_request_counts = defaultdict(list)
         self.endpoint_errors = defaultdict(list)
     
-    def analyze_logs(self, logs: List[LogEntry]) -> List[AttackAlert]:
-        """Analyze logs and generate security alerts - FIXED"""
+    @classmethod
+    @lru_cache(maxsize=None)
+    def compiled_matchers(cls):
+        """Compile the category alternations, Hyperscan database and bot automaton once"""
+        # One alternation per category so each check is a single search
+        compiled_patterns = {
+            name: cls.compile_alternation(patterns)
+            for name, patterns in cls.PATTERN_SOURCES.items()
+        }
+        hs_db = cls.build_hyperscan_db(cls.PATTERN_SOURCES)
+        bot_automaton = cls.build_bot_automaton(cls.BOT_USER_AGENTS)
+        return compiled_patterns, hs_db, bot_automaton
+    
+    def analyze_logs(self, logs: Iterable[LogEntry], chunk_size: int = 50000,
+                     finalize: bool = True, workers: int = 1) -> List[AttackAlert]:
+        """Analyze logs and generate security alerts - FIXED
+        
+        Logs are consumed in a single streaming pass: each chunk is pattern
+        scanned while the per-IP accumulators for the rate, exfiltration and
+        brute-force checks are updated, and those alerts are emitted at the end.
+        With finalize=False RawAlert tuples are returned instead, and only the
+        ones actually consumed need to go through finalize_alert. With
+        workers > 1 the pattern scan runs in that many processes while this
+        one updates the accumulators.
+        """
         alerts = []
         alert_seen = set()  # To avoid duplicate alerts
-        
-        for log in logs:
-            # Check for individual attack patterns
-            log_alerts = self.check_attack_patterns(log)
-            for alert in log_alerts:
-                alert_key = f"{alert.client_ip}:{alert.attack_type}:{alert.endpoint}"
-                if alert_key not in alert_seen:
-                    alerts.append(alert)
-                    alert_seen.add(alert_key)
+        traffic = TrafficAccumulator()
+        chunks = self.chunked(logs, chunk_size)
+        
+        if workers > 1:
+            for chunk, shard_alerts in self.scan_in_processes(chunks, workers, traffic):
+                # Shards dedupe locally; merging in log order keeps the first alert per key
+                for index, attack_type, confidence, details in shard_alerts:
+                    log = chunk[index]
+                    if self.is_new_alert(alert_seen, log, attack_type):
+                        alerts.append(RawAlert(log, attack_type, confidence, details))
+        else:
+            for chunk in chunks:
+                traffic.add_all(chunk)
+                alerts.extend(self.scan_chunk(chunk, alert_seen))
         
         # Check for rate-based attacks
-        rate_alerts = self.check_rate_based_attacks(logs)
-        alerts.extend(rate_alerts)
+        alerts.extend(self.rate_alerts(traffic))
         
         # Check for data exfiltration
-        exfiltration_alerts = self.check_data_exfiltration(logs)
-        alerts.extend(exfiltration_alerts)
+        alerts.extend(self.exfiltration_alerts(traffic))
         
         # Check for brute force attempts
-        brute_force_alerts = self.check_brute_force(logs)
-        alerts.extend(brute_force_alerts)
+        alerts.extend(self.brute_force_alerts(traffic))
         
+        return self.finalize_alerts(alerts) if finalize else alerts
+    
+    def scan_chunk(self, logs: List[LogEntry], alert_seen: Set[Tuple[str, AttackType, str]]) -> List[RawAlert]:
+        """Per-log pattern alerts for a chunk of logs"""
+        if detection_cy is not None:
+            return detection_cy.pattern_alerts(self, logs, alert_seen)
+        
+        alerts = []
+        for log in logs:
+            # Check for individual attack patterns
+            alerts.extend(self.pattern_alerts(log, alert_seen))
         return alerts
     
-    def check_attack_patterns(self, log: LogEntry) -> List[AttackAlert]:
-        """Check individual log entry for attack patterns"""
+    @staticmethod
+    def scan_in_processes(chunks: Iterable[List[LogEntry]], workers: int,
+                          traffic: 'TrafficAccumulator') -> Iterator[Tuple[List[LogEntry], list]]:
+        """Pattern scan chunks in worker processes, yielding (chunk, shard alerts) in order.
+        
+        Only the fields the pattern checks read are sent to the workers. Each
+        chunk is added to traffic while the workers scan.
+        """
+        # Spawned rather than forked: forking after the threaded numba kernel has run can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pending = deque()
+            for chunk in chunks:
+                records = [
+                    ScanRecord(i, log.client_ip, log.endpoint, log.query_params, log.user_agent)
+                    for i, log in enumerate(chunk)
+                ]
+                pending.append((chunk, executor.submit(_scan_shard, records)))
+                traffic.add_all(chunk)
+                
+                # Bound the chunks held in memory while the workers catch up
+                if len(pending) > 2 * workers:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+    
+    @staticmethod
+    def chunked(logs: Iterable[LogEntry], size: int) -> Iterator[List[LogEntry]]:
+        """Yield successive lists of at most size logs"""
+        iterator = iter(logs)
+        while chunk := list(islice(iterator, size)):
+            yield chunk
+    
+    def check_attack_patterns(self, log: LogEntry,
+                              alert_seen: Optional[Set[Tuple[str, AttackType, str]]] = None) -> List[AttackAlert]:
+        """Check individual log entry for attack patterns.
+        
+        If alert_seen is given, alerts whose (client_ip, attack_type, endpoint)
+        key is already in it are skipped before being built, and new keys are added.
+        """
+        return self.finalize_alerts(self.pattern_alerts(log, alert_seen))
+    
+    def pattern_alerts(self, log: LogEntry,
+                       alert_seen: Optional[Set[Tuple[str, AttackType, str]]] = None) -> List[RawAlert]:
+        """Raw alerts for check_attack_patterns"""
         alerts = []
         
         # Combine endpoint and query for pattern matching
-        full_request = log.endpoint
-        if log.query_params:
-            full_request += "?" + log.query_params
-        
-        # Check SQL Injection
-        if self.detect_pattern(full_request, "sql_injection"):
-            alerts.append(self.create_alert(
-                log=log,
-                attack_type=AttackType.SQL_INJECTION,
-                confidence=0.85,
-                details=f"SQL injection pattern detected in request: {full_request[:50]}"
-            ))
-        
-        # Check XSS
-        if self.detect_pattern(full_request, "xss"):
-            alerts.append(self.create_alert(
-                log=log,
-                attack_type=AttackType.XSS,
-                confidence=0.80,
-                details=f"Cross-site scripting pattern detected: {full_request[:50]}"
-            ))
-        
-        # Check Path Traversal
-        if self.detect_pattern(full_request, "path_traversal"):
-            alerts.append(self.create_alert(
-                log=log,
-                attack_type=AttackType.PATH_TRAVERSAL,
-                confidence=0.90,
-                details=f"Path traversal attempt: {full_request[:50]}"
-            ))
-        
-        # Check Common Exploits
-        if self.detect_pattern(full_request, "common_exploits"):
-            alerts.append(self.create_alert(
-                log=log,
-                attack_type=AttackType.EXPLOIT_ATTEMPT,
-                confidence=0.75,
-                details=f"Common exploit pattern: {full_request[:50]}"
-            ))
+        full_request = log.endpoint + "?" + log.query_params if log.query_params else log.endpoint
+        full_request_lower = full_request.lower()
+        endpoint_lower = log.endpoint.lower()
+        
+        matched = self.scan_categories(full_request_lower)
+        
+        # Check SQL injection, XSS, path traversal and common exploits
+        for bit, attack_type, confidence, details in self.category_alerts:
+            if matched & bit and self.is_new_alert(alert_seen, log, attack_type):
+                alerts.append(RawAlert(
+                    log=log,
+                    attack_type=attack_type,
+                    confidence=confidence,
+                    details=details.format(full_request[:50])
+                ))
         
         # Check for suspicious user agents
-        if log.user_agent and self.is_suspicious_user_agent(log.user_agent):
-            alerts.append(self.create_alert(
+        if (log.user_agent and self.is_suspicious_user_agent(log.user_agent)
+                and self.is_new_alert(alert_seen, log, AttackType.SCANNING)):
+            alerts.append(RawAlert(
                 log=log,
                 attack_type=AttackType.SCANNING,
                 confidence=0.70,
@@ -158,8 +363,9 @@ class DetectionEngine:
             ))
         
         # Check for admin access attempts
-        if any(pattern in log.endpoint.lower() for pattern in ['/admin', '/wp-admin', '/administrator']):
-            alerts.append(self.create_alert(
+        if (any(pattern in endpoint_lower for pattern in self.ADMIN_PATHS)
+                and self.is_new_alert(alert_seen, log, AttackType.SUSPICIOUS_ACTIVITY)):
+            alerts.append(RawAlert(
                 log=log,
                 attack_type=AttackType.SUSPICIOUS_ACTIVITY,
                 confidence=0.60,
@@ -167,8 +373,9 @@ class DetectionEngine:
             ))
         
         # Check for sensitive file access
-        if any(pattern in log.endpoint.lower() for pattern in ['.env', '.git', 'config.', 'password']):
-            alerts.append(self.create_alert(
+        if (any(pattern in endpoint_lower for pattern in self.SENSITIVE_FILE_MARKERS)
+                and self.is_new_alert(alert_seen, log, AttackType.EXPLOIT_ATTEMPT)):
+            alerts.append(RawAlert(
                 log=log,
                 attack_type=AttackType.EXPLOIT_ATTEMPT,
                 confidence=0.75,
@@ -181,66 +388,67 @@ class DetectionEngine:
                                 time_window_minutes: int = 5,
                                 request_threshold: int = 100) -> List[AttackAlert]:
         """Check for rate-based attacks (DoS, brute force)"""
+        traffic = TrafficAccumulator()
+        traffic.add_all(logs)
+        return self.finalize_alerts(self.rate_alerts(traffic, time_window_minutes, request_threshold))
+    
+    def rate_alerts(self, traffic: 'TrafficAccumulator',
+                    time_window_minutes: int = 5,
+                    request_threshold: int = 100) -> List[RawAlert]:
+        """DoS alerts from accumulated per-IP request timestamps"""
         alerts = []
         
-        # Group requests by IP
-        ip_requests = defaultdict(list)
-        for log in logs:
-            ip_requests[log.client_ip].append(log.timestamp)
+        if not traffic.timestamps:
+            return alerts
+        
+        # Flatten into one array of timestamps sorted by (IP, time) with per-IP segments
+        ip_ids = np.array(traffic.ip_ids, dtype=np.int64)
+        timestamps = np.array(traffic.timestamps, dtype=np.int64)
+        timestamps = timestamps[np.lexsort((timestamps, ip_ids))]
+        lengths = np.bincount(ip_ids, minlength=len(traffic.ip_index))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        
+        # At least 10 requests (minimum threshold) and request_threshold per IP
+        min_requests = max(10, request_threshold)
+        window_us = time_window_minutes * 60_000_000
+        find_peaks = _peak_windows_numba or _peak_windows_numpy
+        peak_counts, peak_rps = find_peaks(
+            timestamps, offsets, lengths, min_requests, request_threshold, window_us
+        )
         
         # Check each IP for high request rate
-        for ip, timestamps in ip_requests.items():
-            if len(timestamps) < 10:  # Minimum threshold
-                continue
-            
-            # Sort timestamps
-            timestamps.sort()
-            
-            # Simple check: requests per second
-            if len(timestamps) >= request_threshold:
-                # Get a sample log
-                sample_log = next((log for log in logs if log.client_ip == ip), None)
-                if sample_log:
-                    time_range = timestamps[-1] - timestamps[0]
-                    rps = len(timestamps) / max(time_range.total_seconds(), 1)
-                    
-                    if rps > 10:  # More than 10 requests per second
-                        alerts.append(self.create_alert(
-                            log=sample_log,
-                            attack_type=AttackType.DOS,
-                            confidence=0.90,
-                            details=f"High request rate: {len(timestamps)} requests ({rps:.1f}/sec) from {ip}"
-                        ))
+        for ip, k in traffic.ip_index.items():
+            if peak_counts[k]:
+                alerts.append(RawAlert(
+                    log=traffic.first_logs[k],
+                    attack_type=AttackType.DOS,
+                    confidence=0.90,
+                    details=f"High request rate: {peak_counts[k]} requests ({peak_rps[k]:.1f}/sec) from {ip}"
+                ))
         
         return alerts
     
     def check_data_exfiltration(self, logs: List[LogEntry],
                                byte_threshold: int = 10000000) -> List[AttackAlert]:
         """Check for potential data exfiltration"""
+        traffic = TrafficAccumulator()
+        traffic.add_all(logs)
+        return self.finalize_alerts(self.exfiltration_alerts(traffic, byte_threshold))
+    
+    def exfiltration_alerts(self, traffic: 'TrafficAccumulator',
+                            byte_threshold: int = 10000000) -> List[RawAlert]:
+        """Data exfiltration alerts from accumulated per-IP byte totals"""
         alerts = []
         
-        # Group by IP and calculate total bytes transferred
-        ip_bytes = defaultdict(int)
-        ip_logs = defaultdict(list)
-        
-        for log in logs:
-            if log.bytes_sent:
-                ip_bytes[log.client_ip] += log.bytes_sent
-                ip_logs[log.client_ip].append(log)
-        
         # Check for high data transfer
-        for ip, total_bytes in ip_bytes.items():
+        for ip, total_bytes in traffic.ip_bytes.items():
             if total_bytes > byte_threshold:
-                # Get sample log
-                if ip_logs[ip]:
-                    sample_log = ip_logs[ip][0]
-                    
-                    alerts.append(self.create_alert(
-                        log=sample_log,
-                        attack_type=AttackType.DATA_EXFILTRATION,
-                        confidence=0.85,
-                        details=f"Large data transfer: {self.format_bytes(total_bytes)} from {ip}"
-                    ))
+                alerts.append(RawAlert(
+                    log=traffic.first_log_with_bytes[ip],
+                    attack_type=AttackType.DATA_EXFILTRATION,
+                    confidence=0.85,
+                    details=f"Large data transfer: {self.format_bytes(total_bytes)} from {ip}"
+                ))
         
         return alerts
     
@@ -248,71 +456,178 @@ class DetectionEngine:
                          error_threshold: int = 10,
                          time_window_minutes: int = 5) -> List[AttackAlert]:
         """Check for brute force attempts (multiple 401/403/404)"""
+        traffic = TrafficAccumulator()
+        traffic.add_all(logs)
+        return self.finalize_alerts(self.brute_force_alerts(traffic, error_threshold, time_window_minutes))
+    
+    def brute_force_alerts(self, traffic: 'TrafficAccumulator',
+                           error_threshold: int = 10,
+                           time_window_minutes: int = 5) -> List[RawAlert]:
+        """Brute force alerts from accumulated per-IP error responses"""
         alerts = []
         
-        # Filter for error responses
-        error_logs = [log for log in logs if log.status in (401, 403, 404)]
-        
-        # Group by IP
-        ip_errors = defaultdict(list)
-        
-        for log in error_logs:
-            ip_errors[log.client_ip].append((log.timestamp, log.endpoint))
-        
         # Check each IP for rapid errors
-        for ip, errors in ip_errors.items():
-            if len(errors) >= error_threshold:
+        for ip, error_count in traffic.error_counts.items():
+            if error_count >= error_threshold:
                 # Check time range
-                timestamps = [ts for ts, _ in errors]
-                timestamps.sort()
-                time_range = timestamps[-1] - timestamps[0]
+                time_range_us = traffic.last_error_ts[ip] - traffic.first_error_ts[ip]
                 
-                if time_range < timedelta(minutes=time_window_minutes):
+                if time_range_us < time_window_minutes * 60_000_000:
                     # Get endpoint with most errors
-                    endpoints = [ep for _, ep in errors]
-                    from collections import Counter
-                    common_endpoint = Counter(endpoints).most_common(1)[0][0]
+                    common_endpoint = traffic.error_endpoints[ip].most_common(1)[0][0]
                     
-                    # Get sample log
-                    sample_log = next((log for log in logs if log.client_ip == ip and log.endpoint == common_endpoint), None)
-                    if sample_log:
-                        alerts.append(self.create_alert(
-                            log=sample_log,
-                            attack_type=AttackType.BRUTE_FORCE,
-                            confidence=0.95,
-                            details=f"Brute force attempt: {len(errors)} errors in {time_range.seconds//60} minutes on {common_endpoint}"
-                        ))
+                    alerts.append(RawAlert(
+                        log=traffic.first_error_by_ip_ep[(ip, common_endpoint)],
+                        attack_type=AttackType.BRUTE_FORCE,
+                        confidence=0.95,
+                        details=f"Brute force attempt: {error_count} errors in {time_range_us // 60_000_000} minutes on {common_endpoint}"
+                    ))
         
         return alerts
     
+    @staticmethod
+    def is_new_alert(alert_seen: Optional[Set[Tuple[str, AttackType, str]]],
+                     log: LogEntry, attack_type: AttackType) -> bool:
+        """Record the alert key for log and attack_type; False if already seen"""
+        if alert_seen is None:
+            return True
+        
+        key = (log.client_ip, attack_type, log.endpoint)
+        if key in alert_seen:
+            return False
+        alert_seen.add(key)
+        return True
+    
     def detect_pattern(self, text: str, pattern_type: str) -> bool:
         """Check if text matches any pattern of given type"""
-        if pattern_type not in self.compiled_patterns:
+        text_lower = text.lower()
+        pattern = self.compiled_patterns.get(pattern_type)
+        if pattern is None or pattern_type not in self.hinted_categories(text_lower):
             return False
         
-        for pattern in self.compiled_patterns[pattern_type]:
-            if pattern.search(text):
-                return True
-        
-        return False
+        return pattern.search(text_lower) is not None
+    
+    def hinted_categories(self, text_lower: str) -> List[str]:
+        """Categories whose literal hints occur in lowercased text, i.e. that can possibly match"""
+        return [
+            category for category, literals, sequences in self.category_hints
+            if literals(text_lower) or (sequences is not None and sequences(text_lower))
+        ]
+    
+    @staticmethod
+    def compile_hints(hints: Tuple) -> Tuple[Any, Optional[Any]]:
+        """Search for any single-literal hint, and a match for any tuple hint's literals in
+        order (None without tuple hints)"""
+        literals = re.compile('|'.join(re.escape(hint) for hint in hints if isinstance(hint, str)))
+        
+        # From the start, the earliest occurrence of each literal, taken atomically, so text
+        # without them is rejected in one pass rather than retried from every position
+        sequences = '|'.join(
+            ''.join(f'(?>.*?{re.escape(part)})' for part in hint)
+            for hint in hints if not isinstance(hint, str)
+        )
+        return literals.search, re.compile(sequences, re.DOTALL).match if sequences else None
+    
+    def scan_categories(self, text_lower: str) -> int:
+        """Return a bitmask of pattern categories matched by lowercased text"""
+        candidates = self.hinted_categories(text_lower)
+        if not candidates:
+            return 0
+        
+        if self.hs_db is not None:
+            mask = [0]
+            self.hs_db.scan(text_lower.encode('utf-8', errors='replace'),
+                            match_event_handler=self._on_hyperscan_match, context=mask)
+            return mask[0]
+        
+        mask = 0
+        for category in candidates:
+            if self.compiled_patterns[category].search(text_lower):
+                mask |= self.category_bit(category)
+        return mask
+    
+    def category_bit(self, pattern_type: str) -> int:
+        """Bit used for a pattern category in scan_categories masks"""
+        return 1 << self.pattern_categories.index(pattern_type)
+    
+    @staticmethod
+    def _on_hyperscan_match(category_id, start, end, flags, context):
+        context[0] |= 1 << category_id
+    
+    @staticmethod
+    def build_hyperscan_db(pattern_sources: Dict[str, List[str]]):
+        """Compile every category into one Hyperscan block-mode database.
+        
+        Pattern ids are category indexes, so with SINGLEMATCH each category
+        reports at most once per scan. Returns None if Hyperscan is unavailable.
+        """
+        if hyperscan is None:
+            return None
+        
+        expressions, ids = [], []
+        for category_id, patterns in enumerate(pattern_sources.values()):
+            for pattern in patterns:
+                expressions.append(pattern.encode())
+                ids.append(category_id)
+        
+        try:
+            db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            db.compile(
+                expressions=expressions,
+                ids=ids,
+                elements=len(expressions),
+                flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(expressions)
+            )
+            return db
+        except Exception:
+            return None
+    
+    @staticmethod
+    def join_alternation(patterns: List[str]) -> str:
+        """Join regex patterns into one alternation, keeping each self-contained"""
+        return '|'.join(f'(?:{p})' for p in patterns)
+    
+    @staticmethod
+    def compile_alternation(patterns: List[str]):
+        """Compile a list of lowercase patterns into a single alternation.
+        
+        Uses RE2 when installed, falling back to the stdlib engine.
+        """
+        combined = DetectionEngine.join_alternation(patterns)
+        if re2 is not None:
+            try:
+                return re2.compile(combined)
+            except Exception:
+                pass
+        return re.compile(combined)
     
     def is_suspicious_user_agent(self, user_agent: str) -> bool:
         """Check if user agent is suspicious"""
         if not user_agent or user_agent == '-':
             return False
         
+        return self.bot_signature_lookup(user_agent)
+    
+    def has_bot_signature(self, user_agent: str) -> bool:
+        """Check user agent for bots/scanning tools (sqlmap included)"""
         ua_lower = user_agent.lower()
         
-        # Check for bots/scanning tools
-        for bot in self.BOT_USER_AGENTS:
-            if bot in ua_lower:
-                return True
+        if self.bot_automaton is not None:
+            return next(self.bot_automaton.iter(ua_lower), None) is not None
         
-        # Check for sqlmap
-        if 'sqlmap' in ua_lower:
-            return True
-        
-        return False
+        return any(bot in ua_lower for bot in self.BOT_USER_AGENTS)
+    
+    @staticmethod
+    def build_bot_automaton(bot_agents: List[str]):
+        """Build an Aho-Corasick automaton over the bot substrings, or None if unavailable"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for bot in bot_agents:
+            automaton.add_word(bot, bot)
+        automaton.make_automaton()
+        return automaton
     
     def create_alert(self, log: LogEntry, attack_type: AttackType,
                     confidence: float, details: str) -> AttackAlert:
@@ -329,11 +644,88 @@ class DetectionEngine:
             raw_log_sample=log.raw_log[:200] if log.raw_log else None
         )
     
+    def finalize_alert(self, raw: RawAlert) -> AttackAlert:
+        """Build the AttackAlert for a raw alert"""
+        return self.create_alert(*raw)
+    
+    def finalize_alerts(self, raws: List[RawAlert]) -> List[AttackAlert]:
+        """Build AttackAlerts for a list of raw alerts"""
+        return [self.finalize_alert(raw) for raw in raws]
+    
     @staticmethod
-    def format_bytes(bytes_num: int) -> str:
+    def epoch_us(timestamp: datetime) -> int:
+        """Convert a datetime to integer microseconds since the Unix epoch"""
+        return round(timestamp.timestamp() * 1_000_000)
+    
+    @classmethod
+    def format_bytes(cls, bytes_num: int) -> str:
         """Format bytes to human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes_num < 1024.0:
-                return f"{bytes_num:.2f} {unit}"
-            bytes_num /= 1024.0
-        return f"{bytes_num:.2f} PB"
+        # Each unit is 10 more bits, so the bit length picks the unit directly
+        shift = min((bytes_num.bit_length() - 1) // 10, len(cls.BYTE_UNITS) - 1) if bytes_num > 0 else 0
+        return f"{bytes_num / (1 << (shift * 10)):.2f} {cls.BYTE_UNITS[shift]}"
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> DetectionEngine:
+    """Return the process-wide DetectionEngine"""
+    return DetectionEngine()
+
+
+def _scan_shard(records: List[ScanRecord]) -> List[Tuple[int, AttackType, float, str]]:
+    """Worker process entry point: pattern alerts for a shard as (index, attack type, confidence, details)"""
+    alerts = get_engine().scan_chunk(records, set())
+    return [(alert.log.index, alert.attack_type, alert.confidence, alert.details) for alert in alerts]
+
+
+class TrafficAccumulator:
+    """Per-IP traffic state gathered in one pass for the aggregate checks"""
+    
+    def __init__(self):
+        # IP ids in order of first appearance, with each IP's first log as the alert sample
+        self.ip_index: Dict[str, int] = {}
+        self.first_logs: List[LogEntry] = []
+        
+        # One entry per request: IP id and epoch microseconds
+        self.ip_ids: List[int] = []
+        self.timestamps: List[int] = []
+        
+        # Bytes transferred per IP
+        self.ip_bytes = defaultdict(int)
+        self.first_log_with_bytes: Dict[str, LogEntry] = {}
+        
+        # 401/403/404 responses per IP: count, time span and per-endpoint counts
+        self.error_counts = defaultdict(int)
+        self.first_error_ts: Dict[str, int] = {}
+        self.last_error_ts: Dict[str, int] = {}
+        self.error_endpoints = defaultdict(Counter)
+        self.first_error_by_ip_ep: Dict[Tuple[str, str], LogEntry] = {}
+    
+    def add(self, log: LogEntry):
+        """Fold one log into every accumulator"""
+        ip = log.client_ip
+        ip_id = self.ip_index.get(ip)
+        if ip_id is None:
+            ip_id = self.ip_index[ip] = len(self.first_logs)
+            self.first_logs.append(log)
+        
+        timestamp = DetectionEngine.epoch_us(log.timestamp)
+        self.ip_ids.append(ip_id)
+        self.timestamps.append(timestamp)
+        
+        if log.bytes_sent:
+            self.ip_bytes[ip] += log.bytes_sent
+            self.first_log_with_bytes.setdefault(ip, log)
+        
+        if log.status in DetectionEngine.BRUTE_FORCE_STATUSES:
+            self.error_counts[ip] += 1
+            if ip not in self.first_error_ts or timestamp < self.first_error_ts[ip]:
+                self.first_error_ts[ip] = timestamp
+            if ip not in self.last_error_ts or timestamp > self.last_error_ts[ip]:
+                self.last_error_ts[ip] = timestamp
+            self.error_endpoints[ip][log.endpoint] += 1
+            self.first_error_by_ip_ep.setdefault((ip, log.endpoint), log)
+    
+    def add_all(self, logs: Iterable[LogEntry]):
+        """Fold every log into the accumulators"""
+        for log in logs:
+            self.add(log)
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the production server: gunicorn -c gunicorn.conf.py main:app
+
+Uploaded logs and alerts live in each process's logs_data, so every worker
+holds its own dataset. With Redis, /api/metrics and WebSocket broadcasts are
+shared across workers; the other endpoints are not, so keep WEB_CONCURRENCY
+at 1 unless only those are needed. Use `DEV=1 python main.py` (or uvicorn
+--reload) for development.
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", os.getenv("WORKERS", "1")))
+
+# Picks uvloop and httptools (from uvicorn[standard]); uvicorn pings WebSocket clients
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Uploads parse large files in-process; don't let the arbiter kill a busy worker
+timeout = int(os.getenv("WORKER_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+
+# No per-request access log: the app itself analyzes access logs
+accesslog = None
+errorlog = "-"
+loglevel = "info"
@@ -1,10 +1,19 @@
 """
 NGINX Log Parser - Supports multiple log formats
 """
+import os
 import re
 import gzip
-from datetime import datetime, timezone
-from typing import List, Optional
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import repeat
+from operator import itemgetter
+from sys import intern
+import pandas as pd
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from typing import BinaryIO, List, Optional, Iterable, Iterator, TextIO, Tuple, Union
 from models import LogEntry, ErrorLogEntry
 
 class NGINXParser:
@@ -18,17 +27,76 @@ class NGINXParser:
         "error": r'(?P<timestamp>\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}) \[(?P<level>\w+)\] (?P<pid>\d+)#(?P<tid>\d+): \*(?P<cid>\d+) (?P<message>.+?), client: (?P<client>.+?), server: (?P<server>.+?), request: "(?P<request>.+?)", host: "(?P<host>.+?)"'
     }
     
+    # NGINX $time_local, e.g. 01/Jan/2024:12:34:56 +0000
+    CLF_TIMESTAMP = re.compile(
+        r'(\d{2})/([A-Za-z]{3})/(\d{4}):(\d{2}):(\d{2}):(\d{2}) ([+-])(\d{2})([0-5]\d)', re.ASCII
+    )
+    
+    MONTHS = {
+        'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+        'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+    }
+    
+    # parse_access_log_df columns, in LogEntry field order
+    ACCESS_COLUMNS = (
+        'raw_log', 'timestamp', 'client_ip', 'method', 'endpoint', 'query_params',
+        'protocol', 'status', 'bytes_sent', 'referrer', 'user_agent', 'host'
+    )
+    
+    # Access log groups read per line, in this order. Formats without the
+    # last three get '' for them
+    ACCESS_GROUPS = (
+        'ip', 'timestamp', 'method', 'endpoint', 'protocol', 'status', 'bytes',
+        'referrer', 'user_agent', 'host'
+    )
+    
+    # Status field text to int: a dict hit is ~3x cheaper than int() per line
+    STATUS_CODES = {str(code): code for code in range(1000)}
+    
+    # Uploads are decoded and scanned this many bytes (rounded up to a line) at a time
+    DECODE_BLOCK_SIZE = 16 << 20
+    
+    # Uploads parsed from their file are read this many bytes at a time
+    STREAM_READ_SIZE = 1 << 20
+    
+    # Bytes that decode to characters str.strip() removes, per upload encoding
+    SPACE_BYTES = {
+        'utf-8': frozenset(b'\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f '),
+        'latin-1': frozenset(b'\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0')
+    }
+    
     def __init__(self):
         self.compiled_patterns = {
             name: re.compile(pattern) 
             for name, pattern in self.LOG_FORMATS.items()
         }
+        
+        # Line-start anchored variants for scanning a whole buffer with finditer.
+        # These stay on the stdlib engine: the formats are anchored and barely
+        # backtrack, and RE2's capture extraction through its Python binding
+        # measured 3-10x slower than re here (str and bytes input alike)
+        self.line_patterns = {
+            name: re.compile('^' + pattern, re.MULTILINE)
+            for name, pattern in self.LOG_FORMATS.items()
+        }
+        
+        # ACCESS_GROUPS by position from match.groups() + ('',): one tuple per
+        # line instead of a lookup per named group. Index -1 is the trailing ''
+        self.access_getters = {
+            pattern: itemgetter(*(pattern.groupindex.get(group, 0) - 1 for group in self.ACCESS_GROUPS))
+            for pattern in self.line_patterns.values()
+        }
     
     def detect_log_type(self, sample: str) -> str:
         """Detect log type from sample"""
         if "client:" in sample and "server:" in sample:
             return "error"
         
+        # Every access format has '] "' (time field, then the request); without it
+        # none can match, so skip the regex searches
+        if '] "' not in sample:
+            return "combined"
+        
         # Try to match access log patterns
         for name, pattern in self.compiled_patterns.items():
             if name != "error":
@@ -40,97 +108,273 @@ class NGINXParser:
     
     def parse_access_log(self, log_content: str, format_name: str = "combined") -> List[LogEntry]:
         """Parse NGINX access log"""
+        content, start, end = self.strip_scan(log_content)
+        return self.parse_access_lines(content, format_name, start, end)
+    
+    def parse_access_log_df(self, log_content: str, format_name: str = "combined") -> pd.DataFrame:
+        """Parse NGINX access log into a DataFrame with one column per LogEntry
+        field, without building LogEntry objects. Timestamps are in UTC."""
+        pattern = self.line_patterns.get(format_name, self.line_patterns["combined"])
+        access_fields = self.access_getters[pattern]
+        content, start, end = self.strip_scan(log_content)
+        columns = {name: [] for name in self.ACCESS_COLUMNS}
+        
+        for match in pattern.finditer(content, start, end):
+            (ip, timestamp, method, endpoint, protocol, status, bytes_sent,
+             referrer, user_agent, host) = access_fields(match.groups() + ('',))
+            path, separator, query = endpoint.partition('?')
+            columns['raw_log'].append(self.matched_line(content, match))
+            columns['timestamp'].append(timestamp)
+            columns['client_ip'].append(ip)
+            columns['method'].append(method)
+            columns['endpoint'].append(path)
+            columns['query_params'].append(query if separator else None)
+            columns['protocol'].append(protocol)
+            columns['status'].append(self.STATUS_CODES.get(status) or int(status))
+            columns['bytes_sent'].append(int(bytes_sent))
+            columns['referrer'].append(referrer)
+            columns['user_agent'].append(user_agent)
+            columns['host'].append(host)
+        
+        # $time_local is converted in one vectorized call; anything else goes
+        # through parse_timestamp row by row
+        texts = pd.Series(columns['timestamp'], dtype=object)
+        timestamps = pd.to_datetime(texts, format="%d/%b/%Y:%H:%M:%S %z", errors='coerce', utc=True)
+        missing = timestamps.isna()
+        if missing.any():
+            timestamps[missing] = pd.to_datetime(
+                [self.parse_timestamp(text) for text in texts[missing]], utc=True
+            )
+        
+        columns['timestamp'] = timestamps
+        columns['status'] = pd.Series(columns['status'], dtype='int32')
+        columns['bytes_sent'] = pd.Series(columns['bytes_sent'], dtype='int64')
+        return pd.DataFrame(columns)
+    
+    def parse_access_log_parallel(self, log_content: Union[str, bytes], format_name: str = "combined",
+                                  workers: Optional[int] = None, encoding: str = 'utf-8',
+                                  executor: Optional[Executor] = None) -> List[LogEntry]:
+        """parse_access_log over line-aligned slices of log_content in worker processes, those
+        of executor if given (so they stay started between calls) or a pool of their own.
+        bytes content is decoded with encoding a slice at a time, in the workers"""
+        if isinstance(log_content, bytes):
+            content = log_content
+            start, end = self.strip_bounds(content, encoding)
+        else:
+            content, start, end = self.strip_scan(log_content)
+        slices = self.split_lines(content, workers or os.cpu_count() or 1, start, end)
+        if len(slices) < 2:
+            return [entry for part in slices for entry in _parse_access_slice(part, format_name, encoding)]
+        
         entries = []
-        pattern = self.compiled_patterns.get(format_name, self.compiled_patterns["combined"])
+        if executor is not None:
+            for slice_entries in executor.map(_parse_access_slice, slices, repeat(format_name), repeat(encoding)):
+                entries.extend(slice_entries)
+            return entries
         
-        for line in log_content.strip().split('\n'):
-            if not line.strip():
-                continue
+        # Spawned like the detection workers, so no threaded state is forked
+        with ProcessPoolExecutor(max_workers=len(slices), mp_context=multiprocessing.get_context("spawn")) as executor:
+            for slice_entries in executor.map(_parse_access_slice, slices, repeat(format_name), repeat(encoding)):
+                entries.extend(slice_entries)
+        return entries
+    
+    @classmethod
+    def split_lines(cls, content: Union[str, bytes], parts: int, start: int = 0,
+                    end: Optional[int] = None) -> List[Union[str, bytes]]:
+        """content[start:end] cut at line boundaries into at most parts slices of similar size"""
+        end = len(content) if end is None else end
+        return list(cls.line_slices(content, (end - start) // parts + 1, start, end))
+    
+    @staticmethod
+    def line_slices(content: Union[str, bytes], size: int, start: int = 0,
+                    end: Optional[int] = None) -> Iterator[Union[str, bytes]]:
+        """content[start:end] lazily cut at the first line boundary after every size characters"""
+        end = len(content) if end is None else end
+        newline = b'\n' if isinstance(content, bytes) else '\n'
+        while start < end:
+            cut = content.find(newline, start + size, end)
+            if cut == -1:
+                cut = end
+            yield content[start:cut]
+            start = cut + 1
+    
+    def decoded_blocks(self, content: bytes, encoding: str) -> Iterator[str]:
+        """content stripped and decoded a DECODE_BLOCK_SIZE line-aligned block at a time"""
+        start, end = self.strip_bounds(content, encoding)
+        for block in self.line_slices(content, self.DECODE_BLOCK_SIZE, start, end):
+            yield block.decode(encoding)
+    
+    def stream_blocks(self, stream: BinaryIO, encoding: str, head: bytes = b'') -> Iterator[str]:
+        """decoded_blocks of head plus the rest of stream, read STREAM_READ_SIZE bytes at a
+        time; a block is cut at the last newline with more than whitespace after it, so the
+        whole content's stripped ends are only known, and stripped, at the ends"""
+        spaces = self.SPACE_BYTES.get(encoding, self.SPACE_BYTES['utf-8'])
+        pending = bytearray(head)
+        started = False
+        while True:
+            chunk = stream.read(self.STREAM_READ_SIZE)
+            pending += chunk
+            if not started:
+                start = 0
+                while start < len(pending) and pending[start] in spaces:
+                    start += 1
+                del pending[:start]
+                started = bool(pending)
             
-            match = pattern.match(line)
-            if match:
-                try:
-                    data = match.groupdict()
-                    
-                    # Parse timestamp
-                    timestamp_str = data.get('timestamp', '')
-                    timestamp = self.parse_timestamp(timestamp_str)
-                    
-                    # Parse endpoint and query
-                    endpoint = data.get('endpoint', '')
-                    endpoint_parts = endpoint.split('?', 1)
-                    path = endpoint_parts[0]
-                    query = endpoint_parts[1] if len(endpoint_parts) > 1 else None
-                    
-                    # Create log entry
-                    entry = LogEntry(
-                        raw_log=line,
-                        timestamp=timestamp,
-                        client_ip=data.get('ip', ''),
-                        method=data.get('method', ''),
-                        endpoint=path,
-                        query_params=query,
-                        protocol=data.get('protocol', ''),
-                        status=int(data.get('status', 0)),
-                        bytes_sent=int(data.get('bytes', 0)) if data.get('bytes') else 0,
-                        referrer=data.get('referrer', ''),
-                        user_agent=data.get('user_agent', ''),
-                        host=data.get('host', '')
-                    )
-                    
-                    entries.append(entry)
-                    
-                except Exception as e:
-                    print(f"Error parsing line: {line}")
-                    print(f"Error: {e}")
-                    continue
+            # Last non-whitespace byte, if any
+            last = len(pending) - 1
+            while last >= 0 and pending[last] in spaces:
+                last -= 1
+            
+            if not chunk:
+                if last >= 0:
+                    yield pending[:last + 1].decode(encoding)
+                return
+            
+            cut = pending.rfind(b'\n', 0, last) if last > 0 else -1
+            if cut != -1:
+                yield pending[:cut].decode(encoding)
+                del pending[:cut + 1]
+    
+    def parse_access_lines(self, content: str, format_name: str = "combined",
+                           start: int = 0, end: Optional[int] = None) -> List[LogEntry]:
+        """Parse access log lines of content[start:end] as they are, without stripping content"""
+        entries = []
+        pattern = self.line_patterns.get(format_name, self.line_patterns["combined"])
+        
+        # One sweep over the buffer; a match never spans lines
+        for match in pattern.finditer(content, start, len(content) if end is None else end):
+            entry = self.access_entry(match, self.matched_line(content, match))
+            if entry:
+                entries.append(entry)
         
         return entries
     
+    def parse_access_log_stream(self, lines: Iterable[str], format_name: str = "combined") -> Iterator[LogEntry]:
+        """Parse NGINX access log lines lazily, e.g. from open_log_file"""
+        pattern = self.line_patterns.get(format_name, self.line_patterns["combined"])
+        
+        for line in lines:
+            line = line.rstrip('\n')
+            match = pattern.match(line)
+            if match:
+                entry = self.access_entry(match, line)
+                if entry:
+                    yield entry
+    
+    def access_entry(self, match, line: str) -> Optional[LogEntry]:
+        """Build the LogEntry for an access log match, or None if its fields don't parse"""
+        (ip, timestamp_str, method, endpoint, protocol, status, bytes_sent,
+         referrer, user_agent, host) = self.access_getters[match.re](match.groups() + ('',))
+        try:
+            # Parse timestamp
+            timestamp = self.parse_timestamp(timestamp_str)
+            
+            # Parse endpoint and query
+            path, separator, query = endpoint.partition('?')
+            
+            # Create log entry. The highly repeated fields are interned, so every
+            # entry shares one string object per distinct value
+            return LogEntry(
+                raw_log=line,
+                timestamp=timestamp,
+                client_ip=intern(ip),
+                method=intern(method),
+                endpoint=intern(path),
+                query_params=query if separator else None,
+                protocol=intern(protocol),
+                status=self.STATUS_CODES.get(status) or int(status),
+                bytes_sent=int(bytes_sent),
+                referrer=intern(referrer),
+                user_agent=intern(user_agent),
+                host=host
+            )
+            
+        except Exception as e:
+            print(f"Error parsing line: {line}")
+            print(f"Error: {e}")
+            return None
+    
     def parse_error_log(self, log_content: str) -> List[ErrorLogEntry]:
         """Parse NGINX error log"""
+        content, start, end = self.strip_scan(log_content)
+        return self.parse_error_lines(content, start, end)
+    
+    def parse_error_lines(self, content: str, start: int = 0, end: Optional[int] = None) -> List[ErrorLogEntry]:
+        """Parse error log lines of content[start:end] as they are, without stripping content"""
         entries = []
-        pattern = self.compiled_patterns["error"]
+        pattern = self.line_patterns["error"]
         
-        for line in log_content.strip().split('\n'):
-            if not line.strip():
+        for match in pattern.finditer(content, start, len(content) if end is None else end):
+            line = self.matched_line(content, match)
+            try:
+                # Parse timestamp
+                timestamp = self.parse_error_timestamp(match['timestamp'])
+                
+                # Create error log entry
+                entry = ErrorLogEntry(
+                    raw_log=line,
+                    timestamp=timestamp,
+                    level=match['level'],
+                    pid=int(match['pid']),
+                    tid=int(match['tid']),
+                    cid=int(match['cid']),
+                    message=match['message'],
+                    client=match['client'],
+                    server=match['server'],
+                    request=match['request'],
+                    host=match['host']
+                )
+                
+                entries.append(entry)
+                
+            except Exception as e:
+                print(f"Error parsing error log line: {line}")
+                print(f"Error: {e}")
                 continue
-            
-            match = pattern.match(line)
-            if match:
-                try:
-                    data = match.groupdict()
-                    
-                    # Parse timestamp
-                    timestamp_str = data.get('timestamp', '')
-                    timestamp = datetime.strptime(timestamp_str, "%Y/%m/%d %H:%M:%S").replace(tzinfo=timezone.utc)
-                    
-                    # Create error log entry
-                    entry = ErrorLogEntry(
-                        raw_log=line,
-                        timestamp=timestamp,
-                        level=data.get('level', ''),
-                        pid=int(data.get('pid', 0)),
-                        tid=int(data.get('tid', 0)),
-                        cid=int(data.get('cid', 0)),
-                        message=data.get('message', ''),
-                        client=data.get('client', ''),
-                        server=data.get('server', ''),
-                        request=data.get('request', ''),
-                        host=data.get('host', '')
-                    )
-                    
-                    entries.append(entry)
-                    
-                except Exception as e:
-                    print(f"Error parsing error log line: {line}")
-                    print(f"Error: {e}")
-                    continue
         
         return entries
     
+    @staticmethod
+    def matched_line(content: str, match: re.Match) -> str:
+        """The full line of content a line-start anchored match begins, up to the scan's endpos"""
+        line_end = content.find('\n', match.end(), match.endpos)
+        return content[match.start():line_end if line_end != -1 else match.endpos]
+    
+    @staticmethod
+    def strip_scan(content: str) -> Tuple[str, int, int]:
+        """content, start and end for scanning content.strip() with the line patterns,
+        without copying content unless its first line is indented"""
+        start, end = 0, len(content)
+        while start < end and content[start].isspace():
+            start += 1
+        while end > start and content[end - 1].isspace():
+            end -= 1
+        
+        # ^ matches after a newline but not mid-line, even at the scan's start
+        if start and content[start - 1] != '\n':
+            return content[start:end], 0, end - start
+        return content, start, end
+    
+    @classmethod
+    def strip_bounds(cls, content: bytes, encoding: str) -> Tuple[int, int]:
+        """start and end of content once decoded with encoding and stripped, as byte offsets"""
+        spaces = cls.SPACE_BYTES.get(encoding, cls.SPACE_BYTES['utf-8'])
+        start, end = 0, len(content)
+        while start < end and content[start] in spaces:
+            start += 1
+        while end > start and content[end - 1] in spaces:
+            end -= 1
+        return start, end
+    
     def parse_timestamp(self, timestamp_str: str) -> datetime:
         """Parse various timestamp formats"""
+        # Fast path for the NGINX format, without strptime
+        try:
+            return self.parse_clf_timestamp(timestamp_str)
+        except (ValueError, KeyError, TypeError):
+            pass
+        
         formats = [
             "%d/%b/%Y:%H:%M:%S %z",  # 01/Jan/2024:12:34:56 +0000
             "%d/%b/%Y:%H:%M:%S",      # 01/Jan/2024:12:34:56
@@ -151,6 +395,120 @@ class NGINXParser:
         # If all else fails, return current time with UTC timezone
         return datetime.now(timezone.utc)
     
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse_clf_timestamp(timestamp_str: str) -> datetime:
+        """Parse a dd/Mmm/yyyy:HH:MM:SS +ZZZZ timestamp; ValueError if it isn't one"""
+        match = NGINXParser.CLF_TIMESTAMP.fullmatch(timestamp_str)
+        if match is None:
+            raise ValueError(f"not a common log format timestamp: {timestamp_str!r}")
+        
+        day, month, year, hour, minute, second, tz_sign, tz_hours, tz_minutes = match.groups()
+        return datetime(
+            int(year), NGINXParser.MONTHS[month.lower()], int(day),
+            int(hour), int(minute), int(second),
+            tzinfo=NGINXParser.utc_offset(tz_sign, int(tz_hours), int(tz_minutes))
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse_error_timestamp(timestamp_str: str) -> datetime:
+        """Parse an error log yyyy/mm/dd HH:MM:SS timestamp as UTC, with fromisoformat instead of strptime"""
+        return datetime.fromisoformat(timestamp_str.replace('/', '-')).replace(tzinfo=timezone.utc)
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def utc_offset(sign: str, hours: int, minutes: int) -> timezone:
+        """Fixed-offset timezone for a +HHMM / -HHMM offset"""
+        offset = timedelta(hours=hours, minutes=minutes)
+        return timezone(-offset if sign == '-' else offset)
+    
+    def parse_upload(self, content: bytes, log_type: str = "auto", workers: int = 1,
+                     executor: Optional[Executor] = None) -> Tuple[str, List[Union[LogEntry, ErrorLogEntry]]]:
+        """Parse uploaded log bytes as UTF-8, or Latin-1 if any of it isn't valid UTF-8;
+        returns the (detected) log type and its entries. Access logs are split across
+        workers processes when workers > 1, executor's if given"""
+        try:
+            return self.parse_upload_as(content, log_type, workers, 'utf-8', executor)
+        except UnicodeDecodeError:
+            return self.parse_upload_as(content, log_type, workers, 'latin-1', executor)
+    
+    def parse_upload_as(self, content: bytes, log_type: str, workers: int, encoding: str,
+                        executor: Optional[Executor] = None) -> Tuple[str, List[Union[LogEntry, ErrorLogEntry]]]:
+        """parse_upload with one encoding, decoding a block of lines at a time rather than
+        holding the whole upload as one str"""
+        # 1000 characters take at most 4000 bytes; a character cut off past them is ignored
+        sample = content[:4000].decode(encoding, errors='ignore')[:1000]
+        detected_type = self.detect_log_type(sample) if log_type == "auto" else log_type
+        
+        entries = []
+        if detected_type == "error":
+            for block in self.decoded_blocks(content, encoding):
+                entries.extend(self.parse_error_lines(block))
+        elif workers > 1:
+            entries = self.parse_access_log_parallel(content, detected_type, workers=workers,
+                                                     encoding=encoding, executor=executor)
+        else:
+            for block in self.decoded_blocks(content, encoding):
+                entries.extend(self.parse_access_lines(block, detected_type))
+        return detected_type, entries
+    
+    def parse_upload_stream(self, stream: BinaryIO, log_type: str = "auto", workers: int = 1,
+                            executor: Optional[Executor] = None) -> Tuple[str, List[Union[LogEntry, ErrorLogEntry]]]:
+        """parse_upload for an upload still in its seekable file, read a block at a time
+        instead of held whole; a Latin-1 retry reads it again from the start. With workers > 1
+        and an executor, access log blocks are parsed in its processes as they are read"""
+        try:
+            return self.parse_stream_as(stream, log_type, 'utf-8', workers, executor)
+        except UnicodeDecodeError:
+            return self.parse_stream_as(stream, log_type, 'latin-1', workers, executor)
+    
+    def parse_stream_as(self, stream: BinaryIO, log_type: str, encoding: str, workers: int = 1,
+                        executor: Optional[Executor] = None) -> Tuple[str, List[Union[LogEntry, ErrorLogEntry]]]:
+        """parse_upload_stream with one encoding"""
+        stream.seek(0)
+        head = stream.read(4000)
+        sample = head.decode(encoding, errors='ignore')[:1000]
+        detected_type = self.detect_log_type(sample) if log_type == "auto" else log_type
+        blocks = self.stream_blocks(stream, encoding, head)
+        
+        entries = []
+        if detected_type != "error" and workers > 1 and executor is not None:
+            for block_entries in self.parse_blocks_in(executor, blocks, detected_type, 2 * workers):
+                entries.extend(block_entries)
+            return detected_type, entries
+        
+        for block in blocks:
+            if detected_type == "error":
+                entries.extend(self.parse_error_lines(block))
+            else:
+                entries.extend(self.parse_access_lines(block, detected_type))
+        return detected_type, entries
+    
+    @staticmethod
+    def parse_blocks_in(executor: Executor, blocks: Iterator[str], format_name: str,
+                        in_flight: int) -> Iterator[List[LogEntry]]:
+        """Entries of each access log block, parsed in executor's processes and yielded in
+        order, with at most in_flight blocks read ahead of the one being waited on"""
+        pending = deque()
+        try:
+            for block in blocks:
+                pending.append(executor.submit(_parse_access_slice, block, format_name))
+                if len(pending) > in_flight:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # A decode error ends the read early; the blocks already sent aren't needed
+            for future in pending:
+                future.cancel()
+    
+    def open_log_file(self, file_path: str) -> TextIO:
+        """Open a log file for line-by-line reading, supporting .gz compression"""
+        if file_path.endswith('.gz'):
+            return gzip.open(file_path, 'rt', encoding='utf-8')
+        return open(file_path, 'r', encoding='utf-8')
+    
     def read_log_file(self, file_path: str) -> str:
         """Read log file, supporting .gz compression"""
         try:
@@ -163,3 +521,28 @@ class NGINXParser:
         except Exception as e:
             print(f"Error reading file {file_path}: {e}")
             return ""
+
+
+@lru_cache(maxsize=1)
+def get_parser() -> NGINXParser:
+    """Shared parser, built once per process"""
+    return NGINXParser()
+
+
+def _parse_access_slice(content: Union[str, bytes], format_name: str, encoding: str = 'utf-8') -> List[LogEntry]:
+    """Worker entry point for NGINXParser.parse_access_log_parallel"""
+    if isinstance(content, bytes):
+        content = content.decode(encoding)
+    return get_parser().parse_access_lines(content, format_name)
+
+
+def parse_upload_job(content: bytes, log_type: str, detect: bool = False) -> Tuple[str, List[Union[LogEntry, ErrorLogEntry]], Optional[list]]:
+    """Worker entry point for parsing whole uploaded files in a process pool. With detect,
+    access logs also go through DetectionEngine.analyze_logs(finalize=False) here; its raw
+    alerts come back pickled with the entries, still referencing them"""
+    detected_type, entries = get_parser().parse_upload(content, log_type)
+    if not detect or detected_type == "error" or not entries:
+        return detected_type, entries, None
+    
+    from detection_engine import get_engine
+    return detected_type, entries, get_engine().analyze_logs(entries, finalize=False)
@@ -4,27 +4,59 @@ ForenX-NGINX Sentinel - Advanced NGINX Forensic Dashboard v2.0
 Complete with IP Geolocation, Interactive Maps, and Advanced Analytics
 """
 import os
+import io
+import shutil
+import csv
 import json
+import zlib
 import time
 import hashlib
+import heapq
 import asyncio
+import multiprocessing
 import uvicorn
+import numpy as np
 import pandas as pd
 import redis
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional, Any, Tuple
-from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect, HTTPException, Query
+from typing import List, Dict, Optional, Any, Tuple, Iterator, Set, NamedTuple
+from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from pydantic import TypeAdapter
 import logging
 import maxminddb
 from collections import defaultdict, Counter
+from dataclasses import fields
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache, wraps
+from operator import attrgetter
 import re
+from bisect import bisect_left
+
+try:
+    import orjson  # C JSON encoding for API responses
+except ImportError:
+    orjson = None
+
+try:
+    import redis.asyncio as redis_async  # Pub/sub listener for cross-worker broadcasts
+except ImportError:
+    redis_async = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv  # C CSV writer for exports
+    import pyarrow.dataset as ds  # Parquet log store, read back column by column
+except ImportError:
+    pa = pc = pa_csv = ds = None
 
 # Import custom modules
-from log_parser import NGINXParser
-from detection_engine import DetectionEngine
+from log_parser import NGINXParser, parse_upload_job
+from detection_engine import get_engine
 from models import LogEntry, AggregatedMetrics, AttackAlert, ErrorLogEntry, AttackType
 
 # Configure logging
@@ -34,12 +66,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered by orjson; non-string keys (e.g. status codes) become strings like json.dumps"""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
 app = FastAPI(
+    default_response_class=OrjsonResponse if orjson else JSONResponse,
     title="ForenX-NGINX Sentinel v2.0",
     description="Advanced NGINX Forensic Dashboard with IP Geolocation & Interactive Maps",
     version="2.0.0"
 )
 
+# Compress JSON and export bodies; they repeat the same IPs, endpoints and agents
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -51,18 +92,49 @@ app.add_middleware(
 
 # Global instances
 parser = NGINXParser()
-detector = DetectionEngine()
+detector = get_engine()
+
+# Processes used for the detection pattern scan (1 = scan in-process)
+DETECTION_WORKERS = int(os.getenv('DETECTION_WORKERS', '1'))
+
+# Processes used to parse access logs, one per CPU by default (1 = parse in-process)
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(os.cpu_count() or 1)))
+
+# Uvicorn server processes; uploaded logs live in process memory, and only /api/metrics
+# and WebSocket broadcasts are shared through Redis (DEV=1 enables reload instead)
+SERVER_WORKERS = int(os.getenv('WORKERS', '1'))
+DEV_MODE = os.getenv('DEV') == '1'
+
+# Most access / error log entries kept across uploads, and parsed entries kept from one
+# upload; the oldest are dropped first
+MAX_LOGS = int(os.getenv('MAX_LOGS', '5000000'))
+
+# Directory for a Parquet copy of the access log column store; when set (and pyarrow
+# is installed) the column store is kept there between reads instead of in RAM, one
+# subdirectory per server worker process
+LOG_STORE_DIR = os.getenv('LOG_STORE')
 
 # Redis for caching and real-time features
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
 redis_client = None
 try:
-    redis_client = redis.Redis(host='redis', port=6379, decode_responses=True)
+    redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
     redis_client.ping()
     logger.info("Redis connected successfully")
 except:
     logger.warning("Redis not available, using in-memory cache")
     redis_client = None
 
+# Redis keys shared by the server workers (each keeps its own logs_data): a summary of
+# the latest upload, and the channel WebSocket broadcasts fan out through
+SHARED_METRICS_KEY = "sentinel:metrics"
+SHARED_TIMELINE_KEYS = {key: f"sentinel:{key}" for key in ("timeline_min", "timeline_hour", "timeline_day")}
+BROADCAST_CHANNEL = "sentinel:broadcast"
+
+# Seconds between attempts to resubscribe to BROADCAST_CHANNEL, doubling up to the maximum
+RELAY_RETRY_DELAY = 1
+RELAY_RETRY_MAX_DELAY = 30
+
 # GeoIP database
 geoip_reader = None
 GEOIP_DATABASE_PATH = os.getenv('GEOIP_DATABASE', '/app/geolite2/GeoLite2-City.mmdb')
@@ -76,42 +148,99 @@ if os.path.exists(GEOIP_DATABASE_PATH):
 else:
     logger.warning(f"GeoIP database not found at {GEOIP_DATABASE_PATH}")
 
+def new_aggregates() -> Dict[str, Any]:
+    """Empty running aggregates over the uploaded access logs"""
+    return {
+        "ip": Counter(),
+        "endpoint": Counter(),
+        "ua": Counter(),
+        "status": Counter(),
+        "bytes": 0,
+        "timeline_min": Counter(),
+        "timeline_hour": Counter(),
+        "timeline_day": Counter(),
+        "timeline_labels": {},
+        "ip_rows": defaultdict(list)
+    }
+
 # In-memory storage (fallback)
 logs_data = {
-    "access_logs": [],
-    "error_logs": [],
     "parsed_logs": [],
     "alerts": [],
     "metrics": {},
     "file_hashes": {},
     "geolocations": {},
     "hourly_patterns": {},
-    "daily_patterns": {}
+    "daily_patterns": {},
+    "df": None,
+    "log_store": False,
+    "agg": new_aggregates(),
+    "ts_index": None,
+    "version": 0
 }
 
 class ConnectionManager:
-    """Manage WebSocket connections for real-time updates"""
+    """Manage WebSocket connections for real-time updates. With Redis, broadcasts go
+    through BROADCAST_CHANNEL so every server worker forwards them to its own clients"""
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
     
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
     
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        # Serialize once, for the channel or for this worker's clients
+        text = orjson.dumps(message).decode() if orjson else json.dumps(message, separators=(",", ":"))
+        if redis_client and redis_async is not None:
+            # Nobody subscribed means this worker's relay is down too; send locally then
             try:
-                await connection.send_json(message)
-            except:
-                if connection in self.active_connections:
-                    self.active_connections.remove(connection)
+                if await asyncio.to_thread(redis_client.publish, BROADCAST_CHANNEL, text):
+                    return
+            except redis.RedisError as e:
+                logger.warning(f"Broadcast publish failed, sending locally: {e}")
+        await self.send_local(text)
+    
+    async def send_local(self, text: str):
+        # Send to every client at once, then drop the ones that failed
+        connections = list(self.active_connections)
+        results = await asyncio.gather(*(connection.send_text(text) for connection in connections),
+                                       return_exceptions=True)
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.active_connections.discard(connection)
+    
+    async def relay(self):
+        """Forward BROADCAST_CHANNEL messages to this worker's clients until cancelled,
+        resubscribing with exponential backoff whenever the connection is lost"""
+        delay = RELAY_RETRY_DELAY
+        while True:
+            client = redis_async.from_url(REDIS_URL, decode_responses=True)
+            try:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(BROADCAST_CHANNEL)
+                    delay = RELAY_RETRY_DELAY
+                    async for message in pubsub.listen():
+                        await self.send_local(message["data"])
+            except (redis.RedisError, OSError) as e:
+                logger.error(f"Broadcast relay disconnected, retrying in {delay}s: {e}")
+            finally:
+                await client.aclose()
+            
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RELAY_RETRY_MAX_DELAY)
 
 manager = ConnectionManager()
 
+@app.on_event("startup")
+async def start_broadcast_relay():
+    """Relay broadcasts published by any server worker to this worker's WebSocket clients"""
+    if redis_client and redis_async is not None:
+        app.state.broadcast_relay = asyncio.create_task(manager.relay())
+
 # Helper functions
 def get_geolocation(ip_address: str) -> Dict:
     """Get geolocation for an IP address"""
@@ -139,34 +268,310 @@ def get_geolocation(ip_address: str) -> Dict:
     
     return {"city": "Unknown", "country": "Unknown", "latitude": 0, "longitude": 0}
 
-def analyze_traffic_patterns(logs: List[LogEntry]):
-    """Analyze traffic patterns for different time granularities"""
+def category_column(values: List[Any]) -> pd.Categorical:
+    """Categorical of values with categories in first-seen order"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    return pd.Categorical.from_codes(codes, uniques)
+
+def logs_frame(logs: List[LogEntry], wall: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """Column store of access logs, one row per log: repeated strings are
+    category codes, numbers are plain numeric columns (NaN for a missing
+    request_time), timestamp is UTC and wall_time the log's own clock time
+    (wall, if the logs' wall_clock is already known)"""
+    return pd.DataFrame({
+        "client_ip": category_column([log.client_ip for log in logs]),
+        "method": category_column([log.method for log in logs]),
+        "endpoint": category_column([log.endpoint for log in logs]),
+        "user_agent": category_column([log.user_agent for log in logs]),
+        "referrer": category_column([log.referrer for log in logs]),
+        "status": pd.Series([log.status for log in logs], dtype="int32"),
+        "bytes_sent": pd.Series([log.bytes_sent or 0 for log in logs], dtype="int64"),
+        "request_time": pd.Series([log.request_time for log in logs], dtype="float64"),
+        "timestamp": pd.to_datetime([log.timestamp for log in logs], utc=True),
+        "wall_time": wall_clock(logs) if wall is None else wall
+    })
+
+def access_frame(columns: Optional[List[str]] = None, data: Dict[str, Any] = logs_data) -> pd.DataFrame:
+    """logs_frame of the uploaded access logs (in data, logs_data by default), built on first
+    use after an upload. Once spilled to the log store it is read back from there, only the given columns"""
+    if data["df"] is None and data["log_store"]:
+        return read_log_store(columns or list(LOG_FRAME_CATEGORIES) + LOG_FRAME_VALUES)
+    if data["df"] is None:
+        logs = data["parsed_logs"]
+        positions = [i for i, log in enumerate(logs) if isinstance(log, LogEntry)]
+        
+        # Wall-clock times come from the timestamp index when it covers these logs
+        index = data["ts_index"]
+        wall = index.wall[positions] if index is not None and len(index.wall) == len(logs) else None
+        data["df"] = logs_frame([logs[i] for i in positions], wall)
+    return data["df"]
+
+# logs_frame columns: categoricals in first-seen order, then plain values
+LOG_FRAME_CATEGORIES = ("client_ip", "method", "endpoint", "user_agent", "referrer")
+LOG_FRAME_VALUES = ["status", "bytes_sent", "request_time", "timestamp", "wall_time"]
+
+def spill_access_frame():
+    """Write the access column store to this process's Parquet log store (log_store_path) and drop it
+    from RAM, partitioned by UTC day with zstd compression; it stays in RAM if there's nothing to write"""
+    df = access_frame()
+    if not len(df):
+        return
+    
+    # row keeps upload order, which partitioning by day doesn't
+    table = pa.Table.from_pandas(df.assign(row=np.arange(len(df))), preserve_index=False)
+    table = table.append_column("date", pc.strftime(table["timestamp"], format="%Y-%m-%d"))
+    path = log_store_path()
+    shutil.rmtree(path, ignore_errors=True)
+    ds.write_dataset(
+        table, path, format="parquet",
+        partitioning=["date"], partitioning_flavor="hive",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd")
+    )
+    # Readers switch to the store before the frame goes
+    logs_data["log_store"] = True
+    logs_data["df"] = None
+
+def log_store_path() -> str:
+    """This process's directory under LOG_STORE_DIR. Server workers each hold their own upload,
+    so a shared directory would be replaced under another worker still reading it"""
+    return os.path.join(LOG_STORE_DIR, f"worker-{os.getpid()}")
+
+def read_log_store(columns: List[str]) -> pd.DataFrame:
+    """columns of the spilled access column store, memory-mapped and projected, as logs_frame built them"""
+    table = ds.dataset(log_store_path(), format="parquet", partitioning="hive").to_table(columns=columns + ["row"])
+    df = table.sort_by("row").drop(["row"]).to_pandas(coerce_temporal_nanoseconds=True)
+    
+    # Back to logs_frame's dtypes: categories in first-seen order, wall_time in microseconds
+    for column in LOG_FRAME_CATEGORIES:
+        if column in df:
+            codes, uniques = pd.factorize(df[column].astype(object))
+            df[column] = pd.Categorical.from_codes(codes, uniques)
+    if "wall_time" in df:
+        df["wall_time"] = df["wall_time"].astype("datetime64[us]")
+    return df
+
+def aggregate_logs(agg: Dict[str, Any], logs: List[LogEntry], offset: int):
+    """Add access logs, about to be appended to parsed_logs at offset, to the running
+    aggregates, so reads don't rescan the logs"""
+    # Inverted index: client IP -> positions of its logs in parsed_logs
+    ip_rows = agg["ip_rows"]
+    for position, log in enumerate(logs, offset):
+        ip_rows[log.client_ip].append(position)
+    
+    agg["ip"].update(log.client_ip for log in logs)
+    agg["endpoint"].update(log.endpoint for log in logs)
+    agg["ua"].update(log.user_agent for log in logs if log.user_agent)
+    agg["status"].update(log.status for log in logs)
+    agg["bytes"] += sum(log.bytes_sent for log in logs if log.bytes_sent)
+    
+    # Truncate each distinct timestamp once rather than every log's: busy logs repeat
+    # the same second many times. Coarser timelines are rolled up from the minutes
+    minutes = Counter()
+    for timestamp, count in Counter(log.timestamp for log in logs).items():
+        minutes[timestamp.replace(second=0, microsecond=0)] += count
+    agg["timeline_min"].update(minutes)
+    for minute, count in minutes.items():
+        agg["timeline_hour"][minute.replace(minute=0)] += count
+        agg["timeline_day"][minute.replace(hour=0, minute=0)] += count
+
+class TimestampIndex(NamedTuple):
+    """parsed_logs ordered by time, for binary searching time windows"""
+    stamps: np.ndarray  # Log timestamps as ascending UTC nanoseconds
+    order: np.ndarray  # Log positions in that order
+    wall: np.ndarray  # Each log's wall-clock time (in its own UTC offset), in upload order
+    minutes: Tuple[np.ndarray, np.ndarray, np.ndarray]  # minute_table of the logs
+
+def timestamp_index(logs: List[Any]) -> TimestampIndex:
+    """TimestampIndex of logs"""
+    stamps = pd.to_datetime([log.timestamp for log in logs], utc=True).asi8
+    order = np.argsort(stamps, kind="stable")
+    wall = wall_clock(logs)
+    return TimestampIndex(stamps[order], order, wall, minute_table(stamps[order], wall[order]))
+
+def minute_table(stamps: np.ndarray, wall: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Log counts per (UTC minute, wall-clock minute) as ascending UTC minute starts,
+    wall-clock minute starts and counts, from timestamps already sorted by UTC"""
+    minutes = pd.DataFrame({
+        "utc": stamps // MINUTE_NS * MINUTE_NS,
+        "wall": wall.astype("datetime64[m]").astype("datetime64[us]")
+    }).groupby(["utc", "wall"], sort=True).size()
+    return (minutes.index.get_level_values("utc").to_numpy(),
+            minutes.index.get_level_values("wall").to_numpy().astype("datetime64[us]"),
+            minutes.to_numpy())
+
+def current_timestamp_index() -> TimestampIndex:
+    """The timestamp_index of parsed_logs, rebuilt whenever it has changed size since the last one"""
+    logs = logs_data["parsed_logs"]
+    if logs_data["ts_index"] is None or len(logs_data["ts_index"].order) != len(logs):
+        logs_data["ts_index"] = timestamp_index(logs)
+    return logs_data["ts_index"]
+
+def logs_for_ip(ip: str) -> List[Any]:
+    """parsed_logs from one client IP, looked up through its posting list"""
+    logs = logs_data["parsed_logs"]
+    return [logs[i] for i in logs_data["agg"]["ip_rows"].get(ip, ())]
+
+MINUTE_NS = 60 * 10**9
+
+# time_range query values -> look-back window (other values mean all logs)
+TIME_RANGE_WINDOWS = {
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "12h": timedelta(hours=12),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30)
+}
+
+def minutes_since(start_time: Optional[datetime]) -> Tuple[np.ndarray, np.ndarray]:
+    """Wall-clock minutes and their log counts at or after start_time (all of them for None),
+    from the minute_table plus the logs of the minute start_time falls inside"""
+    stamps, order, wall, (utc_minutes, wall_minutes, counts) = current_timestamp_index()
+    if start_time is None:
+        return wall_minutes, counts
+    
+    # Whole minutes come from the table, the partial one from the logs themselves
+    cutoff = pd.Timestamp(start_time).value
+    next_minute = -(-cutoff // MINUTE_NS) * MINUTE_NS
+    first = np.searchsorted(utc_minutes, next_minute, side="left")
+    partial = order[np.searchsorted(stamps, cutoff, side="left"):np.searchsorted(stamps, next_minute, side="left")]
+    return (np.concatenate([wall[partial].astype("datetime64[m]").astype("datetime64[us]"), wall_minutes[first:]]),
+            np.concatenate([np.ones(len(partial), dtype=counts.dtype), counts[first:]]))
+
+# Traffic pattern granularity -> (numpy datetime unit, bucket key format)
+TRAFFIC_GRANULARITIES = {
+    "minute": ("m", "%Y-%m-%d %H:%M"),
+    "hourly": ("h", "%Y-%m-%d %H:00"),
+    "daily": ("D", "%Y-%m-%d"),
+    "weekly": ("D", None),
+    "monthly": ("M", "%Y-%m"),
+}
+
+def wall_clock(logs: List[Any]) -> np.ndarray:
+    """Log timestamps as datetime64[us] wall-clock times, as strftime on each log shows them"""
+    return np.array([log.timestamp.replace(tzinfo=None) for log in logs], dtype="datetime64[us]")
+
+def bucket_counts(wall: np.ndarray, unit: str, weights: Optional[np.ndarray] = None) -> List[Tuple[datetime, int]]:
+    """(bucket start, count) for wall-clock times floored to a numpy unit ('m', 'h', 'D', 'M'),
+    in order of first appearance; weights count each time more than once"""
+    floored = wall.astype(f"datetime64[{unit}]").astype("datetime64[us]")
+    codes, buckets = pd.factorize(floored.view(np.int64))
+    counts = np.bincount(codes, weights=weights, minlength=len(buckets)).astype(np.int64)
+    return list(zip(buckets.astype("datetime64[us]").astype(datetime), counts.tolist()))
+
+def user_agent_category(user_agent: str) -> str:
+    """Browser or client family of a user agent"""
+    ua = user_agent.lower()
+    if 'bot' in ua or 'crawler' in ua or 'spider' in ua:
+        return 'Bot'
+    elif 'mobile' in ua:
+        return 'Mobile'
+    elif 'chrome' in ua:
+        return 'Chrome'
+    elif 'firefox' in ua:
+        return 'Firefox'
+    elif 'safari' in ua:
+        return 'Safari'
+    elif 'edge' in ua:
+        return 'Edge'
+    return 'Other'
+
+# Cached read endpoints (the dashboard polls them): results live for one upload
+# version and at most READ_CACHE_TTL seconds
+READ_CACHE_TTL = 5
+READ_CACHE_SIZE = 256
+
+def cached_read(endpoint):
+    """Cache an async read endpoint's result by arguments until the next upload or TTL window"""
+    cache = {}
+    stamp = None
+    
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        nonlocal stamp
+        current = (logs_data["version"], int(time.monotonic() // READ_CACHE_TTL))
+        if current != stamp or len(cache) >= READ_CACHE_SIZE:
+            cache.clear()
+            stamp = current
+        key = (args, tuple(sorted(kwargs.items())))
+        if key not in cache:
+            cache[key] = await endpoint(*args, **kwargs)
+        return cache[key]
+    return wrapper
+
+def spooled_digest(spool: Any) -> str:
+    """SHA-256 of an upload's spooled file, in C with hashlib.file_digest; leaves it at its end"""
+    spool.seek(0)
+    return hashlib.file_digest(spool, "sha256").hexdigest()
+
+def spooled_content(spool: Any) -> Tuple[bytes, str]:
+    """An upload's spooled file read back whole, and its hex digest"""
+    file_hash = spooled_digest(spool)
+    spool.seek(0)
+    return spool.read(), file_hash
+
+def parse_spooled(spool: Any, log_type: str, workers: int = 1,
+                  executor: Optional[Executor] = None) -> Tuple[int, str, str, List[Any]]:
+    """Hash an upload's spooled file, then parse it from there a block at a time, so the
+    upload is never held whole (blocks go to executor's workers if workers > 1); returns
+    its size, hash, detected type and entries"""
+    file_hash = spooled_digest(spool)
+    size = spool.tell()
+    return (size, file_hash) + parser.parse_upload_stream(spool, log_type, workers, executor)
+
+# Serializes uploads, so they parse and swap in their data one at a time
+upload_lock = asyncio.Lock()
+
+@lru_cache(maxsize=1)
+def parse_pool() -> ProcessPoolExecutor:
+    """Process pool for parsing uploads, whole files or slices of one, started on first use"""
+    # Spawned like the detection workers, so no threaded state is forked
+    return ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+async def parse_upload(file: UploadFile, log_type: str,
+                       file_count: int) -> Tuple[int, str, str, List[Any], Optional[list]]:
+    """Hash and parse one uploaded file off the event loop; returns its size, hash, detected
+    type, entries and raw alerts (None if detection is left to the caller)"""
+    # A single file streams from its spooled file, its blocks parsed by the pool's workers
+    if PARSE_WORKERS <= 1 or file_count == 1:
+        executor = parse_pool() if PARSE_WORKERS > 1 else None
+        return await asyncio.to_thread(parse_spooled, file.file, log_type, PARSE_WORKERS, executor) + (None,)
+    
+    # Several files go to the process pool whole, detection included; the workers need the bytes
+    content, file_hash = await asyncio.to_thread(spooled_content, file.file)
+    loop = asyncio.get_running_loop()
+    return (len(content), file_hash) + await loop.run_in_executor(parse_pool(), parse_upload_job, content, log_type, True)
+
+def analyze_traffic_patterns(wall: np.ndarray, data: Dict[str, Any] = logs_data):
+    """Analyze traffic patterns for different time granularities of logs with wall-clock
+    times wall, into data (logs_data by default)"""
     hourly_patterns = defaultdict(int)
     daily_patterns = defaultdict(int)
     weekday_patterns = defaultdict(int)
     
-    for log in logs:
-        if hasattr(log, 'timestamp'):
-            # Hourly pattern
-            hour_key = log.timestamp.strftime("%H:00")
-            hourly_patterns[hour_key] += 1
-            
-            # Daily pattern
-            date_key = log.timestamp.strftime("%Y-%m-%d")
-            daily_patterns[date_key] += 1
-            
-            # Weekday pattern
-            weekday_key = log.timestamp.strftime("%A")
-            weekday_patterns[weekday_key] += 1
+    # Format each distinct hour once instead of every log
+    for hour, count in bucket_counts(wall, "h"):
+        hourly_patterns[hour.strftime("%H:00")] += count
+        daily_patterns[hour.strftime("%Y-%m-%d")] += count
+        weekday_patterns[hour.strftime("%A")] += count
     
-    logs_data["hourly_patterns"] = dict(sorted(hourly_patterns.items()))
-    logs_data["daily_patterns"] = dict(sorted(daily_patterns.items()))
-    logs_data["weekday_patterns"] = weekday_patterns
+    data["hourly_patterns"] = dict(sorted(hourly_patterns.items()))
+    data["daily_patterns"] = dict(sorted(daily_patterns.items()))
+    data["weekday_patterns"] = weekday_patterns
+
+def top_bandwidth(df: pd.DataFrame, column: str, limit: Optional[int] = 20) -> Dict:
+    """Bytes sent per value of column, largest first, ties in first-seen order
+    (all of them in first-seen order for limit=None)"""
+    sent = df[df["bytes_sent"] > 0]
+    totals = sent.groupby(column, sort=False, observed=True)["bytes_sent"].sum()
+    if limit is None:
+        return totals.to_dict()
+    return totals.sort_values(ascending=False, kind="stable").head(limit).to_dict()
 
 def calculate_bandwidth_usage(logs: List[LogEntry]) -> Dict:
     """Calculate bandwidth usage by IP and endpoint"""
-    ip_bandwidth = defaultdict(int)
-    endpoint_bandwidth = defaultdict(int)
+    ip_bandwidth = Counter()
+    endpoint_bandwidth = Counter()
     
     for log in logs:
         if hasattr(log, 'bytes_sent') and log.bytes_sent:
@@ -181,8 +586,8 @@ def calculate_bandwidth_usage(logs: List[LogEntry]) -> Dict:
                 endpoint_bandwidth[log.endpoint] += bytes_sent
     
     return {
-        "ip_bandwidth": dict(sorted(ip_bandwidth.items(), key=lambda x: x[1], reverse=True)[:20]),
-        "endpoint_bandwidth": dict(sorted(endpoint_bandwidth.items(), key=lambda x: x[1], reverse=True)[:20])
+        "ip_bandwidth": dict(ip_bandwidth.most_common(20)),
+        "endpoint_bandwidth": dict(endpoint_bandwidth.most_common(20))
     }
 
 @app.get("/")
@@ -216,12 +621,65 @@ async def upload_logs(
         "file_hashes": []
     }
     
-    # Clear existing data
-    logs_data["parsed_logs"] = []
-    logs_data["alerts"] = []
-    logs_data["geolocations"] = {}
+    async with upload_lock:
+        # Read, hash and parse every file concurrently, off the event loop
+        uploads = await asyncio.gather(*(parse_upload(file, log_type, len(files)) for file in files),
+                                       return_exceptions=True)
+        
+        # Merge off the event loop into new state, swapped in at once, so readers on
+        # the event loop see either the previous upload's data or this one's
+        logs_data.update(await asyncio.to_thread(merge_uploads, files, uploads, results))
+        
+        # Invalidate cached read endpoint results
+        logs_data["version"] += 1
+        
+        # Keep the column store on disk between reads if configured; RAM otherwise
+        if logs_data["parsed_logs"] and LOG_STORE_DIR and ds is not None:
+            try:
+                await asyncio.to_thread(spill_access_frame)
+            except Exception as e:
+                logger.error(f"Failed to write log store at {log_store_path()}: {e}")
+        
+        # Let the other server workers serve this upload's metrics
+        if redis_client:
+            try:
+                await asyncio.to_thread(share_upload_summary)
+            except redis.RedisError as e:
+                logger.error(f"Failed to share upload summary: {e}")
+    
+    await manager.broadcast({
+        "type": "upload_complete",
+        "version": logs_data["version"],
+        "metrics": logs_data["metrics"]
+    })
     
-    for file in files:
+    logger.info(f"Upload complete: {results}")
+    return results
+
+def merge_uploads(files: List[UploadFile], uploads: List[Any], results: Dict[str, Any]) -> Dict[str, Any]:
+    """logs_data entries replacing the previous upload's, merged from parse_upload results
+    in upload order (with each file's outcome added to results)"""
+    data = {
+        "parsed_logs": [],
+        "alerts": [],
+        "geolocations": {},
+        "df": None,
+        "log_store": False,
+        "agg": new_aggregates(),
+        "ts_index": None,
+        "file_hashes": dict(logs_data["file_hashes"])
+    }
+    
+    # Keep the newest MAX_LOGS entries of the upload, as a deque(maxlen=MAX_LOGS) would,
+    # by dropping the oldest before anything is aggregated
+    total = sum(len(upload[3]) for upload in uploads if not isinstance(upload, Exception))
+    excess = total - MAX_LOGS
+    if excess > 0:
+        logger.warning(f"Keeping the newest {MAX_LOGS} of {total} uploaded records")
+    
+    # Merge results in upload order
+    pattern_rows = None
+    for file, upload in zip(files, uploads):
         try:
             logger.info(f"Processing file: {file.filename}")
             
@@ -232,69 +690,52 @@ async def upload_logs(
             if is_rotated:
                 logger.info(f"Detected rotated log file: {file.filename}")
             
-            # Read file content
-            content = await file.read()
-            
-            # Calculate hash
-            file_hash = hashlib.sha256(content).hexdigest()
-            
-            # Decode content
-            try:
-                content_str = content.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    content_str = content.decode('latin-1', errors='ignore')
-                except:
-                    content_str = content.decode('utf-8', errors='ignore')
-            
-            # Detect log type
-            sample = content_str[:1000] if len(content_str) > 1000 else content_str
-            if log_type == "auto":
-                detected_type = parser.detect_log_type(sample)
-            else:
-                detected_type = log_type
+            if isinstance(upload, Exception):
+                raise upload
+            size, file_hash, detected_type, parsed, upload_alerts = upload
+            if excess > 0 and parsed:
+                dropped = min(excess, len(parsed))
+                parsed = parsed[dropped:]
+                excess -= dropped
+                
+                # Pool-side alerts may point at dropped entries; detect again below
+                upload_alerts = None
             
             logger.info(f"Detected log type: {detected_type} for {file.filename}")
             
-            # Parse logs
-            parsed = []
-            if detected_type == "error":
-                parsed = parser.parse_error_log(content_str)
-                logs_data["error_logs"].extend(parsed)
-            else:
-                parsed = parser.parse_access_log(content_str, detected_type)
-                logs_data["access_logs"].extend(parsed)
+            # parsed_logs is the only store; access and error entries differ by type
+            if detected_type != "error":
+                aggregate_logs(data["agg"], parsed, len(data["parsed_logs"]))
             
-            logs_data["parsed_logs"].extend(parsed)
+            data["parsed_logs"].extend(parsed)
             
             # Extract geolocations for new IPs
             geolocations_added = 0
             if detected_type != "error":
-                unique_ips = set()
-                for log in parsed:
-                    if hasattr(log, 'client_ip') and log.client_ip:
-                        ip = log.client_ip
-                        if ip not in logs_data["geolocations"]:
-                            geo = get_geolocation(ip)
-                            logs_data["geolocations"][ip] = geo
-                            geolocations_added += 1
-                        unique_ips.add(ip)
+                # Each distinct IP of the file once, in first-seen order
+                for ip in dict.fromkeys(log.client_ip for log in parsed):
+                    if ip and ip not in data["geolocations"]:
+                        data["geolocations"][ip] = get_geolocation(ip)
+                        geolocations_added += 1
             
             # Run detection
             if detected_type != "error" and parsed:
-                alerts = detector.analyze_logs(parsed)
-                logs_data["alerts"].extend(alerts)
+                # Alerts are only counted here, so keep them unbuilt, unless the parse pool already detected
+                alerts = upload_alerts
+                if alerts is None:
+                    alerts = detector.analyze_logs(parsed, finalize=False, workers=DETECTION_WORKERS)
+                data["alerts"].extend(alerts)
                 results["alerts_found"] += len(alerts)
             
-            # Analyze patterns
+            # Patterns are of the last file with logs, analyzed once the index is built
             if parsed:
-                analyze_traffic_patterns(parsed)
+                pattern_rows = slice(len(data["parsed_logs"]) - len(parsed), len(data["parsed_logs"]))
             
             # Store file info
-            logs_data["file_hashes"][file.filename] = {
+            data["file_hashes"][file.filename] = {
                 "hash": file_hash,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
-                "size": len(content),
+                "size": size,
                 "type": detected_type,
                 "rotated": is_rotated
             }
@@ -321,17 +762,40 @@ async def upload_logs(
                 "success": False
             })
     
-    # Update metrics and cache
+    # The index's wall-clock times serve the patterns and column store too
+    if data["parsed_logs"]:
+        data["ts_index"] = timestamp_index(data["parsed_logs"])
+        if pattern_rows is not None:
+            analyze_traffic_patterns(data["ts_index"].wall[pattern_rows], data)
+        update_metrics(data)
+    return data
+
+def share_upload_summary():
+    """Replace the upload summary in Redis with this worker's: metrics as JSON fields of one
+    hash, each running timeline as a bucket -> count hash; written in one MULTI/EXEC"""
+    agg = logs_data["agg"]
+    pipe = redis_client.pipeline()
+    pipe.delete(SHARED_METRICS_KEY, *SHARED_TIMELINE_KEYS.values())
     if logs_data["parsed_logs"]:
-        update_metrics()
-        if redis_client:
-            cache_key = f"metrics:{datetime.now().strftime('%Y%m%d')}"
-            redis_client.setex(cache_key, 3600, json.dumps(logs_data["metrics"]))
-    
-    logger.info(f"Upload complete: {results}")
-    return results
+        pipe.hset(SHARED_METRICS_KEY, mapping={name: json.dumps(value) for name, value in logs_data["metrics"].items()})
+        for timeline_key, redis_key in SHARED_TIMELINE_KEYS.items():
+            if agg[timeline_key]:
+                pipe.hset(redis_key, mapping={bucket.isoformat(): count for bucket, count in agg[timeline_key].items()})
+    pipe.execute()
+
+def shared_metrics(timeline_key: str) -> Optional[Tuple[Dict[str, Any], Dict[datetime, int]]]:
+    """Metrics and one timeline of the upload summary in Redis, or None if there isn't one"""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(SHARED_METRICS_KEY)
+    pipe.hgetall(SHARED_TIMELINE_KEYS[timeline_key])
+    metrics, timeline = pipe.execute()
+    if not metrics:
+        return None
+    return ({name: json.loads(value) for name, value in metrics.items()},
+            {datetime.fromisoformat(bucket): int(count) for bucket, count in timeline.items()})
 
 @app.get("/api/geographic-distribution")
+@cached_read
 async def get_geographic_distribution(
     group_by: str = "country",
     limit: int = 50
@@ -341,15 +805,10 @@ async def get_geographic_distribution(
         return {"locations": [], "summary": {}}
     
     locations = []
-    ip_counts = defaultdict(int)
-    
-    for log in logs_data["parsed_logs"]:
-        if hasattr(log, 'client_ip'):
-            ip = log.client_ip
-            ip_counts[ip] += 1
+    ip_counts = logs_data["agg"]["ip"]
     
     # Get geolocation for each unique IP
-    for ip, count in sorted(ip_counts.items(), key=lambda x: x[1], reverse=True)[:limit]:
+    for ip, count in ip_counts.most_common(limit):
         geo = logs_data["geolocations"].get(ip, get_geolocation(ip))
         
         if group_by == "city":
@@ -392,6 +851,7 @@ async def get_geographic_distribution(
     }
 
 @app.get("/api/traffic-patterns")
+@cached_read
 async def get_traffic_patterns(
     granularity: str = "hourly",
     time_range: str = "7d"
@@ -400,46 +860,20 @@ async def get_traffic_patterns(
     if not logs_data["parsed_logs"]:
         return {"patterns": {}, "summary": {}}
     
-    now = datetime.now(timezone.utc)
-    
-    # Calculate time window
-    if time_range == "1h":
-        start_time = now - timedelta(hours=1)
-    elif time_range == "6h":
-        start_time = now - timedelta(hours=6)
-    elif time_range == "24h":
-        start_time = now - timedelta(hours=24)
-    elif time_range == "7d":
-        start_time = now - timedelta(days=7)
-    elif time_range == "30d":
-        start_time = now - timedelta(days=30)
-    else:
-        start_time = datetime.min.replace(tzinfo=timezone.utc)
-    
-    # Filter logs
-    filtered_logs = [
-        log for log in logs_data["parsed_logs"]
-        if hasattr(log, 'timestamp') and log.timestamp >= start_time
-    ]
+    # Per-minute counts built with the timestamp index, so this scales with minutes, not logs
+    window = TIME_RANGE_WINDOWS.get(time_range)
+    wall_minutes, counts = minutes_since(datetime.now(timezone.utc) - window if window else None)
     
+    unit, key_format = TRAFFIC_GRANULARITIES.get(granularity, TRAFFIC_GRANULARITIES["minute"])
     patterns = defaultdict(int)
     
-    for log in filtered_logs:
-        if granularity == "minute":
-            key = log.timestamp.strftime("%Y-%m-%d %H:%M")
-        elif granularity == "hourly":
-            key = log.timestamp.strftime("%Y-%m-%d %H:00")
-        elif granularity == "daily":
-            key = log.timestamp.strftime("%Y-%m-%d")
-        elif granularity == "weekly":
-            week_num = log.timestamp.isocalendar()[1]
-            key = f"{log.timestamp.year}-W{week_num:02d}"
-        elif granularity == "monthly":
-            key = log.timestamp.strftime("%Y-%m")
+    # Count per time bucket, then format each distinct bucket once
+    for bucket, count in bucket_counts(wall_minutes, unit, counts):
+        if granularity == "weekly":
+            key = f"{bucket.year}-W{bucket.isocalendar()[1]:02d}"
         else:
-            key = log.timestamp.strftime("%Y-%m-%d %H:%M")
-        
-        patterns[key] += 1
+            key = bucket.strftime(key_format)
+        patterns[key] += count
     
     # Sort by time
     sorted_patterns = dict(sorted(patterns.items()))
@@ -466,6 +900,7 @@ async def get_traffic_patterns(
     }
 
 @app.get("/api/bandwidth-analysis")
+@cached_read
 async def get_bandwidth_analysis(
     group_by: str = "ip",  # ip, endpoint, hour, day
     top_n: int = 20
@@ -474,36 +909,24 @@ async def get_bandwidth_analysis(
     if not logs_data["parsed_logs"]:
         return {"analysis": {}, "summary": {}}
     
-    logs = logs_data["parsed_logs"]
-    
-    if group_by == "ip":
-        data = defaultdict(int)
-        for log in logs:
-            if hasattr(log, 'client_ip') and hasattr(log, 'bytes_sent') and log.bytes_sent:
-                data[log.client_ip] += int(log.bytes_sent)
+    df = access_frame(["client_ip", "endpoint", "bytes_sent", "wall_time"])
     
-    elif group_by == "endpoint":
-        data = defaultdict(int)
-        for log in logs:
-            if hasattr(log, 'endpoint') and hasattr(log, 'bytes_sent') and log.bytes_sent:
-                data[log.endpoint] += int(log.bytes_sent)
+    if group_by in ("ip", "endpoint"):
+        data = Counter(top_bandwidth(df, "client_ip" if group_by == "ip" else "endpoint", limit=None))
     
     elif group_by == "hour":
-        data = defaultdict(int)
-        for log in logs:
-            if hasattr(log, 'timestamp') and hasattr(log, 'bytes_sent') and log.bytes_sent:
-                hour_key = log.timestamp.strftime("%H:00")
-                data[hour_key] += int(log.bytes_sent)
+        # Group by the log's own clock hour; keys stay in first-seen order for most_common ties
+        sent = df[df["bytes_sent"] > 0]
+        totals = sent.groupby(sent["wall_time"].dt.hour, sort=False)["bytes_sent"].sum()
+        data = Counter({f"{hour:02d}:00": int(total) for hour, total in totals.items()})
     
     elif group_by == "day":
-        data = defaultdict(int)
-        for log in logs:
-            if hasattr(log, 'timestamp') and hasattr(log, 'bytes_sent') and log.bytes_sent:
-                day_key = log.timestamp.strftime("%Y-%m-%d")
-                data[day_key] += int(log.bytes_sent)
+        sent = df[df["bytes_sent"] > 0]
+        totals = sent.groupby(sent["wall_time"].dt.floor("D"), sort=False)["bytes_sent"].sum()
+        data = Counter({day.strftime("%Y-%m-%d"): int(total) for day, total in totals.items()})
     
     # Sort and limit
-    sorted_data = dict(sorted(data.items(), key=lambda x: x[1], reverse=True)[:top_n])
+    sorted_data = dict(data.most_common(top_n))
     
     # Calculate summary
     total_bytes = sum(data.values())
@@ -514,13 +937,14 @@ async def get_bandwidth_analysis(
         "summary": {
             "total_bytes": total_bytes,
             "average_bytes_per_entry": avg_bytes,
-            "entries_with_bandwidth": len([log for log in logs if hasattr(log, 'bytes_sent') and log.bytes_sent]),
+            "entries_with_bandwidth": int((df["bytes_sent"] > 0).sum()),
             "top_consumer": max(data.items(), key=lambda x: x[1])[0] if data else None
         },
         "group_by": group_by
     }
 
 @app.get("/api/advanced-metrics")
+@cached_read
 async def get_advanced_metrics():
     """Get advanced metrics for dashboard"""
     if not logs_data["parsed_logs"]:
@@ -533,71 +957,63 @@ async def get_advanced_metrics():
     
     logs = logs_data["parsed_logs"]
     
-    # Response time analysis
-    response_times = []
-    for log in logs:
-        if hasattr(log, 'request_time') and log.request_time:
-            response_times.append(log.request_time)
+    df = access_frame(["client_ip", "user_agent", "referrer", "status", "bytes_sent",
+                       "request_time", "timestamp", "wall_time"])
     
-    # User engagement (sessions based on IP and time)
-    sessions = defaultdict(list)
-    for log in logs:
-        if hasattr(log, 'client_ip') and hasattr(log, 'timestamp'):
-            ip = log.client_ip
-            hour = log.timestamp.replace(minute=0, second=0, microsecond=0)
-            sessions[(ip, hour)].append(log.timestamp)
+    # Response time analysis, over logs with a non-zero request_time
+    request_times = df["request_time"].to_numpy()
+    response_times = request_times[~np.isnan(request_times) & (request_times != 0)]
+    sorted_times = np.sort(response_times)
+    
+    # User engagement: sessions are (IP, clock hour) pairs. Hours are compared as
+    # instants, like the aware datetimes they stand for, so the UTC offset is subtracted
+    wall_ns = df["wall_time"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    utc_ns = pd.DatetimeIndex(df["timestamp"]).asi8
+    hour_ns = 3_600_000_000_000
+    session_hours = wall_ns // hour_ns * hour_ns - (wall_ns - utc_ns)
+    sessions = pd.DataFrame({"ip": df["client_ip"].cat.codes, "hour": session_hours}).groupby(["ip", "hour"]).size()
     
     # Traffic sources
-    referrers = defaultdict(int)
+    referrers = Counter({
+        referrer: int(count)
+        for referrer, count in df["referrer"].value_counts(sort=False).items()
+        if referrer and referrer != '-' and count
+    })
+    
+    # Categorize each distinct user agent once, weighted by its request count
     user_agents = defaultdict(int)
-    for log in logs:
-        if hasattr(log, 'referrer') and log.referrer and log.referrer != '-':
-            referrers[log.referrer] += 1
-        if hasattr(log, 'user_agent') and log.user_agent:
-            # Categorize user agents
-            ua = log.user_agent.lower()
-            if 'bot' in ua or 'crawler' in ua or 'spider' in ua:
-                category = 'Bot'
-            elif 'mobile' in ua:
-                category = 'Mobile'
-            elif 'chrome' in ua:
-                category = 'Chrome'
-            elif 'firefox' in ua:
-                category = 'Firefox'
-            elif 'safari' in ua:
-                category = 'Safari'
-            elif 'edge' in ua:
-                category = 'Edge'
-            else:
-                category = 'Other'
-            user_agents[category] += 1
+    for user_agent, count in df["user_agent"].value_counts(sort=False).items():
+        if user_agent and count:
+            user_agents[user_agent_category(user_agent)] += count
     
     return {
         "response_times": {
-            "average": sum(response_times) / len(response_times) if response_times else 0,
-            "p95": sorted(response_times)[int(len(response_times) * 0.95)] if response_times else 0,
-            "p99": sorted(response_times)[int(len(response_times) * 0.99)] if response_times else 0,
-            "max": max(response_times) if response_times else 0,
-            "min": min(response_times) if response_times else 0
+            "average": sum(response_times.tolist()) / len(response_times) if len(response_times) else 0,
+            "p95": float(sorted_times[int(len(sorted_times) * 0.95)]) if len(sorted_times) else 0,
+            "p99": float(sorted_times[int(len(sorted_times) * 0.99)]) if len(sorted_times) else 0,
+            "max": float(sorted_times[-1]) if len(sorted_times) else 0,
+            "min": float(sorted_times[0]) if len(sorted_times) else 0
         },
         "user_engagement": {
             "total_sessions": len(sessions),
-            "average_session_length": sum(len(v) for v in sessions.values()) / len(sessions) if sessions else 0,
-            "returning_users": len(set(ip for ip, _ in sessions.keys())),
-            "peak_concurrent": max(len(v) for v in sessions.values()) if sessions else 0
+            "average_session_length": int(sessions.sum()) / len(sessions) if len(sessions) else 0,
+            "returning_users": df["client_ip"].nunique(),
+            "peak_concurrent": int(sessions.max()) if len(sessions) else 0
         },
         "traffic_sources": {
-            "direct": len([log for log in logs if not hasattr(log, 'referrer') or log.referrer == '-']),
-            "referrers": dict(sorted(referrers.items(), key=lambda x: x[1], reverse=True)[:10]),
+            # Error log entries have no referrer, so they count as direct
+            "direct": len(logs) - len(df) + int((df["referrer"] == '-').sum()),
+            "referrers": dict(referrers.most_common(10)),
             "user_agents": dict(user_agents)
         },
         "performance": {
-            "cache_hit_rate": len([log for log in logs if hasattr(log, 'status') and log.status == 304]) / len(logs) if logs else 0,
-            "compression_rate": len([log for log in logs if hasattr(log, 'bytes_sent') and log.bytes_sent and log.bytes_sent < 1000]) / len(logs) if logs else 0
+            "cache_hit_rate": int((df["status"] == 304).sum()) / len(logs) if logs else 0,
+            "compression_rate": int(df["bytes_sent"].between(1, 999).sum()) / len(logs) if logs else 0
         }
     }
 
 @app.get("/api/interactive-map")
+@cached_read
 async def get_interactive_map_data(
     zoom_level: int = 2,
     cluster: bool = True
@@ -606,11 +1022,8 @@ async def get_interactive_map_data(
     if not logs_data["parsed_logs"]:
         return {"markers": [], "clusters": [], "heatmap": []}
     
-    # Get unique IPs with counts
-    ip_counts = defaultdict(int)
-    for log in logs_data["parsed_logs"]:
-        if hasattr(log, 'client_ip'):
-            ip_counts[log.client_ip] += 1
+    # Unique IPs with counts, from the running per-IP Counter (first-seen order)
+    ip_counts = logs_data["agg"]["ip"]
     
     markers = []
     clusters = defaultdict(list)
@@ -682,71 +1095,79 @@ async def get_interactive_map_data(
         }
     }
 
+# Warnlists for /api/warnings (configurable)
+WARNLISTS = {
+    "suspicious_ips": [
+        r"10\.0\.0\.",
+        r"192\.168\.",
+        r"172\.(1[6-9]|2[0-9]|3[0-1])\.",
+        r"127\.0\.0\.1"
+    ],
+    "suspicious_paths": [
+        r"/\.env",
+        r"/\.git",
+        r"/wp-admin",
+        r"/admin",
+        r"/\.\./"
+    ],
+    "error_codes": ["500", "502", "503", "504"],
+    "slow_requests": ["request_time > 5.0"]
+}
+
+# Compiled once instead of looked up in re's cache per log
+WARN_IP_PATTERNS = [re.compile(pattern) for pattern in WARNLISTS["suspicious_ips"]]
+WARN_PATH_PATTERNS = [re.compile(pattern) for pattern in WARNLISTS["suspicious_paths"]]
+WARN_STATUS_CODES = frozenset(int(code) for code in WARNLISTS["error_codes"])
+
+@lru_cache(maxsize=65536)
+def ip_warnings(ip: str) -> Tuple[str, ...]:
+    """Warning entries for a client IP, one per matching suspicious_ips prefix pattern"""
+    return tuple(f"Suspicious IP: {ip}" for pattern in WARN_IP_PATTERNS if pattern.match(ip))
+
+@lru_cache(maxsize=65536)
+def path_warnings(endpoint: str) -> Tuple[str, ...]:
+    """Warning entries for an endpoint, one per matching suspicious_paths pattern"""
+    return tuple(f"Suspicious path: {endpoint}" for pattern in WARN_PATH_PATTERNS if pattern.search(endpoint))
+
 @app.get("/api/warnings")
+@cached_read
 async def get_warnings():
     """Get warning lines based on warnlists"""
     if not logs_data["parsed_logs"]:
         return {"warnings": [], "warnlists": {}}
     
-    # Define warnlists (configurable)
-    warnlists = {
-        "suspicious_ips": [
-            r"10\.0\.0\.",
-            r"192\.168\.",
-            r"172\.(1[6-9]|2[0-9]|3[0-1])\.",
-            r"127\.0\.0\.1"
-        ],
-        "suspicious_paths": [
-            r"/\.env",
-            r"/\.git",
-            r"/wp-admin",
-            r"/admin",
-            r"/\.\./"
-        ],
-        "error_codes": ["500", "502", "503", "504"],
-        "slow_requests": ["request_time > 5.0"]
-    }
-    
     warnings = []
     
     for log in logs_data["parsed_logs"]:
-        warning_entries = []
+        # Error log entries have none of the checked fields
+        if not isinstance(log, LogEntry):
+            continue
         
-        # Check IPs
-        if hasattr(log, 'client_ip'):
-            for pattern in warnlists["suspicious_ips"]:
-                if re.match(pattern, log.client_ip):
-                    warning_entries.append(f"Suspicious IP: {log.client_ip}")
-        
-        # Check paths
-        if hasattr(log, 'endpoint'):
-            for pattern in warnlists["suspicious_paths"]:
-                if re.search(pattern, log.endpoint):
-                    warning_entries.append(f"Suspicious path: {log.endpoint}")
+        # Check IPs and paths, once per distinct value
+        warning_entries = [*ip_warnings(log.client_ip), *path_warnings(log.endpoint)]
         
         # Check status codes
-        if hasattr(log, 'status'):
-            if str(log.status) in warnlists["error_codes"]:
-                warning_entries.append(f"Error status: {log.status}")
+        if log.status in WARN_STATUS_CODES:
+            warning_entries.append(f"Error status: {log.status}")
         
         # Check request times
-        if hasattr(log, 'request_time'):
-            if log.request_time > 5.0:
-                warning_entries.append(f"Slow request: {log.request_time}s")
+        request_time = log.request_time
+        if request_time and request_time > 5.0:
+            warning_entries.append(f"Slow request: {request_time}s")
         
         if warning_entries:
             warnings.append({
-                "timestamp": log.timestamp.isoformat() if hasattr(log, 'timestamp') else None,
-                "ip": log.client_ip if hasattr(log, 'client_ip') else None,
-                "endpoint": log.endpoint if hasattr(log, 'endpoint') else None,
-                "status": log.status if hasattr(log, 'status') else None,
+                "timestamp": log.timestamp.isoformat(),
+                "ip": log.client_ip,
+                "endpoint": log.endpoint,
+                "status": log.status,
                 "warnings": warning_entries,
-                "raw_log": log.raw_log[:200] if hasattr(log, 'raw_log') else None
+                "raw_log": log.raw_log[:200]
             })
     
     return {
         "warnings": warnings,
-        "warnlists": warnlists,
+        "warnlists": WARNLISTS,
         "summary": {
             "total_warnings": len(warnings),
             "warning_types": Counter([w for warning in warnings for w in warning["warnings"]]),
@@ -754,7 +1175,13 @@ async def get_warnings():
         }
     }
 
+def split_groups(codes: np.ndarray, values: np.ndarray, count: int) -> List[np.ndarray]:
+    """values split by their group code 0..count-1, each group keeping the values' order"""
+    order = np.argsort(codes, kind="stable")
+    return np.split(values[order], np.cumsum(np.bincount(codes, minlength=count))[:-1])
+
 @app.get("/api/speed-analysis")
+@cached_read
 async def get_speed_analysis(
     percentile: int = 95
 ):
@@ -762,20 +1189,20 @@ async def get_speed_analysis(
     if not logs_data["parsed_logs"]:
         return {"analysis": {}, "percentiles": {}}
     
-    logs = logs_data["parsed_logs"]
+    df = access_frame(["endpoint", "request_time", "wall_time"])
     
-    # Extract request times
-    request_times = []
-    for log in logs:
-        if hasattr(log, 'request_time') and log.request_time:
-            request_times.append(log.request_time)
+    # Extract request times, from logs with a non-zero request_time
+    timed = df[df["request_time"].notna() & (df["request_time"] != 0)]
+    times = timed["request_time"].to_numpy()
     
-    if not request_times:
+    if not len(times):
         return {"analysis": {}, "percentiles": {}, "message": "No request time data available"}
     
-    # Calculate statistics
-    request_times_sorted = sorted(request_times)
+    # Calculate statistics; sums run over Python floats in log order, as before
+    request_times = times.tolist()
+    request_times_sorted = np.sort(times).tolist()
     n = len(request_times_sorted)
+    mean = sum(request_times) / n
     
     percentiles = {
         "p50": request_times_sorted[int(n * 0.50)],
@@ -786,72 +1213,206 @@ async def get_speed_analysis(
         "p100": request_times_sorted[-1]
     }
     
-    # Group by endpoint
-    endpoint_times = defaultdict(list)
-    for log in logs:
-        if hasattr(log, 'endpoint') and hasattr(log, 'request_time') and log.request_time:
-            endpoint_times[log.endpoint].append(log.request_time)
+    # Group by endpoint, in first-seen order
+    codes, endpoint_codes = pd.factorize(timed["endpoint"].cat.codes.to_numpy())
+    endpoints = timed["endpoint"].cat.categories[endpoint_codes]
     
     endpoint_stats = {}
-    for endpoint, times in endpoint_times.items():
-        if times:
-            endpoint_stats[endpoint] = {
-                "count": len(times),
-                "average": sum(times) / len(times),
-                "p95": sorted(times)[int(len(times) * 0.95)],
-                "max": max(times),
-                "min": min(times)
-            }
+    for endpoint, group in zip(endpoints, split_groups(codes, times, len(endpoints))):
+        group_times = group.tolist()
+        endpoint_stats[endpoint] = {
+            "count": len(group_times),
+            "average": sum(group_times) / len(group_times),
+            "p95": float(np.sort(group)[int(len(group_times) * 0.95)]),
+            "max": max(group_times),
+            "min": min(group_times)
+        }
     
-    # Group by hour
-    hourly_times = defaultdict(list)
-    for log in logs:
-        if hasattr(log, 'timestamp') and hasattr(log, 'request_time') and log.request_time:
-            hour_key = log.timestamp.strftime("%H:00")
-            hourly_times[hour_key].append(log.request_time)
+    # Group by the log's own clock hour
+    hours = timed["wall_time"].dt.hour.to_numpy()
     
     hourly_stats = {}
-    for hour, times in sorted(hourly_times.items()):
-        if times:
-            hourly_stats[hour] = {
-                "count": len(times),
-                "average": sum(times) / len(times),
-                "p95": sorted(times)[int(len(times) * 0.95)],
-                "peak_time": max(times)
+    for hour, group in enumerate(split_groups(hours, times, 24)):
+        if len(group):
+            group_times = group.tolist()
+            hourly_stats[f"{hour:02d}:00"] = {
+                "count": len(group_times),
+                "average": sum(group_times) / len(group_times),
+                "p95": float(np.sort(group)[int(len(group_times) * 0.95)]),
+                "peak_time": max(group_times)
             }
     
     return {
         "analysis": {
             "total_requests_with_time": len(request_times),
-            "average_response_time": sum(request_times) / n,
+            "average_response_time": mean,
             "median_response_time": request_times_sorted[n // 2],
-            "fastest_response": min(request_times),
-            "slowest_response": max(request_times),
-            "std_dev": (sum((x - (sum(request_times)/n))**2 for x in request_times) / n)**0.5
+            "fastest_response": request_times_sorted[0],
+            "slowest_response": request_times_sorted[-1],
+            "std_dev": (sum((x - mean)**2 for x in request_times) / n)**0.5
         },
         "percentiles": percentiles,
-        "endpoint_stats": dict(sorted(endpoint_stats.items(), key=lambda x: x[1]["average"], reverse=True)[:20]),
+        "endpoint_stats": dict(heapq.nlargest(20, endpoint_stats.items(), key=lambda x: x[1]["average"])),
         "hourly_stats": hourly_stats,
         "performance_grades": {
-            "excellent": len([t for t in request_times if t < 0.1]),
-            "good": len([t for t in request_times if 0.1 <= t < 0.5]),
-            "fair": len([t for t in request_times if 0.5 <= t < 1.0]),
-            "poor": len([t for t in request_times if t >= 1.0])
+            "excellent": int((times < 0.1).sum()),
+            "good": int(((times >= 0.1) & (times < 0.5)).sum()),
+            "fair": int(((times >= 0.5) & (times < 1.0)).sum()),
+            "poor": int((times >= 1.0).sum())
         }
     }
 
 # Keep existing endpoints with improvements
+# time_range: (window, running timeline, bucket label format)
+METRIC_TIME_RANGES = {
+    "1h": (TIME_RANGE_WINDOWS["1h"], "timeline_min", "%Y-%m-%d %H:%M"),
+    "6h": (TIME_RANGE_WINDOWS["6h"], "timeline_min", "%Y-%m-%d %H:%M"),
+    "12h": (TIME_RANGE_WINDOWS["12h"], "timeline_hour", "%Y-%m-%d %H:00"),
+    "24h": (TIME_RANGE_WINDOWS["24h"], "timeline_hour", "%Y-%m-%d %H:00"),
+    "7d": (TIME_RANGE_WINDOWS["7d"], "timeline_hour", "%Y-%m-%d %H:00"),
+    "30d": (TIME_RANGE_WINDOWS["30d"], "timeline_day", "%Y-%m-%d")
+}
+
+# top-data category: running aggregate key
+TOP_DATA_CATEGORIES = {
+    "ips": "ip",
+    "endpoints": "endpoint",
+    "user_agents": "ua",
+    "status": "status"
+}
+
+def labelled_timeline(timeline: Dict[datetime, int], label_format: str) -> Tuple[List[datetime], List[str], List[int]]:
+    """A timeline's buckets in time order, with their labels and counts"""
+    buckets = sorted(timeline)
+    return buckets, [bucket.strftime(label_format) for bucket in buckets], [timeline[bucket] for bucket in buckets]
+
+def timeline_labels(timeline_key: str, label_format: str) -> Tuple[List[datetime], List[str], List[int]]:
+    """labelled_timeline of a running timeline, built once per upload"""
+    cache = logs_data["agg"]["timeline_labels"]
+    if (timeline_key, label_format) not in cache:
+        cache[timeline_key, label_format] = labelled_timeline(logs_data["agg"][timeline_key], label_format)
+    return cache[timeline_key, label_format]
+
 @app.get("/api/metrics")
+@cached_read
 async def get_metrics(time_range: str = "24h"):
-    """Enhanced metrics endpoint"""
-    # ... (keep existing implementation but add caching)
-    pass
+    """Enhanced metrics endpoint, read from the running aggregates"""
+    window, timeline_key, label_format = METRIC_TIME_RANGES.get(time_range, METRIC_TIME_RANGES["24h"])
+    start_time = datetime.now(timezone.utc) - window
+    metrics = logs_data["metrics"]
+    buckets, labels, counts = timeline_labels(timeline_key, label_format)
+    
+    # Another server worker may have taken the upload; use the summary it shared
+    if not logs_data["parsed_logs"] and redis_client:
+        try:
+            shared = await asyncio.to_thread(shared_metrics, timeline_key)
+            if shared:
+                metrics, timeline = shared
+                buckets, labels, counts = labelled_timeline(timeline, label_format)
+        except redis.RedisError as e:
+            logger.warning(f"Shared metrics unavailable: {e}")
+    
+    # Buckets are in time order, so the window is a slice from its first bucket
+    start = bisect_left(buckets, start_time)
+    return {
+        "metrics": metrics,
+        "timeline": dict(zip(labels[start:], counts[start:])),
+        "time_range": time_range
+    }
 
 @app.get("/api/top-data")
+@cached_read
 async def get_top_data(category: str = "ips", limit: int = 10):
-    """Enhanced top-data endpoint"""
-    # ... (keep existing implementation)
-    pass
+    """Enhanced top-data endpoint, read from the running aggregates"""
+    key = TOP_DATA_CATEGORIES.get(category)
+    if key is None:
+        raise HTTPException(status_code=400, detail=f"Unknown category: {category}")
+    
+    return {
+        "category": category,
+        "data": [
+            {"value": value, "count": count}
+            for value, count in logs_data["agg"][key].most_common(limit)
+        ]
+    }
+
+# Export columns, and rows serialized per streamed chunk
+EXPORT_FIELDS = [field.name for field in fields(LogEntry)]
+EXPORT_BATCH_ROWS = 10000
+LOG_LIST_ADAPTER = TypeAdapter(List[LogEntry])
+
+def export_csv_chunks(logs: List[LogEntry]) -> Iterator[Any]:
+    """CSV text for logs, header first, then EXPORT_BATCH_ROWS rows per chunk"""
+    if pa_csv is not None:
+        yield from arrow_csv_chunks(logs)
+        return
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    get_fields = attrgetter(*EXPORT_FIELDS)
+    for start in range(0, len(logs), EXPORT_BATCH_ROWS):
+        writer.writerows(get_fields(log) for log in logs[start:start + EXPORT_BATCH_ROWS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def arrow_csv_chunks(logs: List[LogEntry]) -> Iterator[bytes]:
+    """export_csv_chunks written by pyarrow's C CSV writer (strings quoted) from one
+    column per field, so only the column gathering runs per row in Python"""
+    buffer = io.BytesIO()
+    pa_csv.write_csv(pa.table({field: pa.nulls(0) for field in EXPORT_FIELDS}), buffer)
+    yield buffer.getvalue()
+    
+    options = pa_csv.WriteOptions(include_header=False)
+    for start in range(0, len(logs), EXPORT_BATCH_ROWS):
+        batch = logs[start:start + EXPORT_BATCH_ROWS]
+        columns = {field: list(map(attrgetter(field), batch)) for field in EXPORT_FIELDS}
+        
+        # Offsets differ per log, so timestamps are written as csv.writer would, via str
+        columns["timestamp"] = list(map(str, columns["timestamp"]))
+        buffer = io.BytesIO()
+        pa_csv.write_csv(pa.table(columns), buffer, options)
+        yield buffer.getvalue()
+
+def export_json_chunks(logs: List[LogEntry]) -> Iterator[bytes]:
+    """JSON array bytes for logs, EXPORT_BATCH_ROWS objects per chunk"""
+    yield b"["
+    for start in range(0, len(logs), EXPORT_BATCH_ROWS):
+        # One pydantic-core call per batch; strip its brackets to splice batches together
+        rows = LOG_LIST_ADAPTER.dump_json(logs[start:start + EXPORT_BATCH_ROWS])[1:-1]
+        yield rows if start == 0 else b"," + rows
+    yield b"]\n"
+
+def gzip_chunks(chunks: Iterator[Any]) -> Iterator[bytes]:
+    """str / bytes chunks compressed on the fly into one gzip stream (level 1, for speed)"""
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.get("/api/export-logs")
+async def export_logs(request: Request, format: str = "csv"):
+    """Stream the uploaded access logs as CSV or a JSON array, without building them in memory,
+    gzip-encoded when the client accepts it"""
+    if format not in ("csv", "json"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+    
+    logs = [log for log in logs_data["parsed_logs"] if isinstance(log, LogEntry)]
+    chunks = export_csv_chunks(logs) if format == "csv" else export_json_chunks(logs)
+    headers = {"Content-Disposition": f"attachment; filename=nginx_logs.{format}"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv" if format == "csv" else "application/json",
+        headers=headers
+    )
 
 @app.websocket("/ws/realtime")
 async def websocket_realtime(websocket: WebSocket):
@@ -884,29 +1445,40 @@ async def websocket_realtime(websocket: WebSocket):
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket)
 
-def update_metrics():
-    """Update all metrics"""
-    if logs_data["parsed_logs"]:
-        logs = logs_data["parsed_logs"]
+def update_metrics(data: Dict[str, Any] = logs_data):
+    """Update all metrics of data (logs_data by default)"""
+    if data["parsed_logs"]:
+        logs = data["parsed_logs"]
+        df = access_frame(["client_ip", "endpoint", "bytes_sent"], data)
         
-        # Basic metrics
+        # Basic metrics, aggregated over the access log columns
         total_requests = len(logs)
-        unique_ips = len(set(log.client_ip for log in logs if hasattr(log, 'client_ip')))
-        total_bytes = sum(int(log.bytes_sent) for log in logs if hasattr(log, 'bytes_sent') and log.bytes_sent)
+        unique_ips = len(data["agg"]["ip"])
+        total_bytes = data["agg"]["bytes"]
         
-        status_4xx = len([log for log in logs if hasattr(log, 'status') and 400 <= log.status < 500])
-        status_5xx = len([log for log in logs if hasattr(log, 'status') and 500 <= log.status < 600])
+        # Count of each status class (status // 100), from the per-status counts
+        statuses = data["agg"]["status"]
+        status_classes = np.bincount(
+            np.fromiter(statuses.keys(), dtype=np.int64, count=len(statuses)) // 100,
+            weights=np.fromiter(statuses.values(), dtype=np.int64, count=len(statuses)),
+            minlength=6
+        ).astype(np.int64)
+        status_4xx = int(status_classes[4])
+        status_5xx = int(status_classes[5])
         error_rate = (status_4xx + status_5xx) / total_requests if total_requests > 0 else 0
         
-        logs_data["metrics"] = {
+        data["metrics"] = {
             "total_requests": total_requests,
             "unique_ips": unique_ips,
             "total_bytes": total_bytes,
             "status_4xx": status_4xx,
             "status_5xx": status_5xx,
             "error_rate": error_rate,
-            "geolocations": len(logs_data["geolocations"]),
-            "bandwidth": calculate_bandwidth_usage(logs)
+            "geolocations": len(data["geolocations"]),
+            "bandwidth": {
+                "ip_bandwidth": top_bandwidth(df, "client_ip"),
+                "endpoint_bandwidth": top_bandwidth(df, "endpoint")
+            }
         }
 
 # Create necessary directories
@@ -916,9 +1488,15 @@ os.makedirs("samples/nginx_logs", exist_ok=True)
 
 if __name__ == "__main__":
     uvicorn.run(
-        app,
+        "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        reload=DEV_MODE,
+        workers=None if DEV_MODE else SERVER_WORKERS,
+        ws_ping_interval=30,
+        ws_ping_timeout=10,
+        access_log=False,
         log_level="info"
     )
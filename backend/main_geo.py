@@ -3,6 +3,7 @@
 ForenX-NGINX Sentinel Pro with Enhanced GeoIP Support
 """
 # ... [Previous imports remain the same] ...
+import heapq
 from geoip_manager import GeoIPManager
 
 # Initialize GeoIP Manager
@@ -61,13 +62,12 @@ async def lookup_ip(ip_address: str, detailed: bool = False):
     return result
 
 @app.get("/api/geo-distribution/enhanced")
+@cached_read
 async def get_enhanced_geo_distribution():
     """Get enhanced geographic distribution with ISP and ASN data"""
     if not logs_data["parsed_logs"] or not geoip_manager:
         return {"error": "No data or GeoIP database available"}
     
-    logs = logs_data["parsed_logs"]
-    
     geo_data = {
         "countries": defaultdict(int),
         "cities": defaultdict(int),
@@ -78,80 +78,69 @@ async def get_enhanced_geo_distribution():
         "heatmap_data": []
     }
     
-    processed_ips = set()
+    # Each distinct IP once, in first-seen order, looked up in one batch
+    ips = list(logs_data["agg"]["ip"])
+    coordinate_index = {}
     
-    for log in logs:
-        if hasattr(log, 'client_ip'):
-            ip = log.client_ip
-            
-            # Skip if already processed
-            if ip in processed_ips:
-                continue
-            
-            processed_ips.add(ip)
-            location = geoip_manager.get_location(ip)
+    for ip, location in zip(ips, geoip_manager.get_locations(ips)):
+        if location:
+            # Update counts
+            if location.country:
+                geo_data["countries"][location.country] += 1
+            if location.city:
+                geo_data["cities"][location.city] += 1
+            if location.region:
+                geo_data["regions"][location.region] += 1
+            if location.isp:
+                geo_data["isps"][location.isp] += 1
+            if location.asn:
+                geo_data["asns"][location.asn] += 1
             
-            if location:
-                # Update counts
-                if location.country:
-                    geo_data["countries"][location.country] += 1
-                if location.city:
-                    geo_data["cities"][location.city] += 1
-                if location.region:
-                    geo_data["regions"][location.region] += 1
-                if location.isp:
-                    geo_data["isps"][location.isp] += 1
-                if location.asn:
-                    geo_data["asns"][location.asn] += 1
+            # Add coordinate for map
+            if location.latitude and location.longitude:
+                # Find an existing coordinate by dict lookup rather than a list scan
+                existing_coord = coordinate_index.get((location.latitude, location.longitude))
+                
+                if existing_coord:
+                    existing_coord["count"] += 1
+                    existing_coord["ips"].append(ip)
+                else:
+                    coordinate = {
+                        "lat": location.latitude,
+                        "lon": location.longitude,
+                        "count": 1,
+                        "country": location.country,
+                        "city": location.city,
+                        "ips": [ip]
+                    }
+                    geo_data["coordinates"].append(coordinate)
+                    coordinate_index[(location.latitude, location.longitude)] = coordinate
                 
-                # Add coordinate for map
-                if location.latitude and location.longitude:
-                    coord_key = f"{location.latitude:.4f},{location.longitude:.4f}"
-                    
-                    # Check if coordinate already exists
-                    existing_coord = next(
-                        (c for c in geo_data["coordinates"] 
-                         if c["lat"] == location.latitude and c["lon"] == location.longitude),
-                        None
-                    )
-                    
-                    if existing_coord:
-                        existing_coord["count"] += 1
-                        existing_coord["ips"].append(ip)
-                    else:
-                        geo_data["coordinates"].append({
-                            "lat": location.latitude,
-                            "lon": location.longitude,
-                            "count": 1,
-                            "country": location.country,
-                            "city": location.city,
-                            "ips": [ip]
-                        })
-                    
-                    # Add to heatmap data
-                    geo_data["heatmap_data"].append([
-                        location.latitude,
-                        location.longitude,
-                        1  # Weight
-                    ])
+                # Add to heatmap data
+                geo_data["heatmap_data"].append([
+                    location.latitude,
+                    location.longitude,
+                    1  # Weight
+                ])
     
     # Sort and limit top entries
     geo_data["top_countries"] = dict(
-        sorted(geo_data["countries"].items(), key=lambda x: x[1], reverse=True)[:20]
+        heapq.nlargest(20, geo_data["countries"].items(), key=lambda x: x[1])
     )
     geo_data["top_cities"] = dict(
-        sorted(geo_data["cities"].items(), key=lambda x: x[1], reverse=True)[:20]
+        heapq.nlargest(20, geo_data["cities"].items(), key=lambda x: x[1])
     )
     geo_data["top_isps"] = dict(
-        sorted(geo_data["isps"].items(), key=lambda x: x[1], reverse=True)[:10]
+        heapq.nlargest(10, geo_data["isps"].items(), key=lambda x: x[1])
     )
     geo_data["top_asns"] = dict(
-        sorted(geo_data["asns"].items(), key=lambda x: x[1], reverse=True)[:10]
+        heapq.nlargest(10, geo_data["asns"].items(), key=lambda x: x[1])
     )
     
     return geo_data
 
 @app.get("/api/attack-origins")
+@cached_read
 async def get_attack_origins():
     """Get geographic origins of security attacks"""
     if not logs_data["alerts"] or not geoip_manager:
@@ -167,14 +156,15 @@ async def get_attack_origins():
         "attack_types": defaultdict(int)
     }
     
-    for alert in alerts:
+    # Look up every alert IP in one batch
+    locations = geoip_manager.get_locations([alert.client_ip for alert in alerts])
+    
+    for alert, location in zip(alerts, locations):
         ip = alert.client_ip
         attack_type = alert.attack_type.value if hasattr(alert.attack_type, 'value') else str(alert.attack_type)
         
         attack_origins["attack_types"][attack_type] += 1
         
-        location = geoip_manager.get_location(ip)
-        
         if location:
             # Update country stats
             if location.country:
@@ -218,45 +208,36 @@ async def get_attack_origins():
     
     # Sort and get top entries
     attack_origins["top_countries"] = dict(
-        sorted(attack_origins["by_country"].items(), key=lambda x: x[1]["count"], reverse=True)[:10]
+        heapq.nlargest(10, attack_origins["by_country"].items(), key=lambda x: x[1]["count"])
     )
     attack_origins["top_cities"] = dict(
-        sorted(attack_origins["by_city"].items(), key=lambda x: x[1]["count"], reverse=True)[:10]
+        heapq.nlargest(10, attack_origins["by_city"].items(), key=lambda x: x[1]["count"])
     )
     attack_origins["top_isps"] = dict(
-        sorted(attack_origins["by_isp"].items(), key=lambda x: x[1]["count"], reverse=True)[:10]
+        heapq.nlargest(10, attack_origins["by_isp"].items(), key=lambda x: x[1]["count"])
     )
     
     return attack_origins
 
 @app.get("/api/geoip/top-threats")
+@cached_read
 async def get_top_geo_threats(limit: int = 20):
     """Get top geographic threats with detailed information"""
     if not logs_data["parsed_logs"] or not geoip_manager:
         return {"error": "No data or GeoIP database available"}
     
-    logs = logs_data["parsed_logs"]
     alerts = logs_data["alerts"]
     
-    # Get all unique IPs
-    all_ips = set()
-    ip_request_counts = defaultdict(int)
-    ip_alert_counts = defaultdict(int)
-    ip_alert_types = defaultdict(lambda: defaultdict(int))
-    
-    # Count requests per IP
-    for log in logs:
-        if hasattr(log, 'client_ip'):
-            ip = log.client_ip
-            all_ips.add(ip)
-            ip_request_counts[ip] += 1
+    # Requests per IP come from the running per-IP Counter
+    ip_request_counts = logs_data["agg"]["ip"]
+    all_ips = set(ip_request_counts)
     
     # Count alerts per IP
+    ip_alert_counts = Counter(alert.client_ip for alert in alerts)
+    ip_alert_types = defaultdict(Counter)
     for alert in alerts:
-        ip = alert.client_ip
         attack_type = alert.attack_type.value if hasattr(alert.attack_type, 'value') else str(alert.attack_type)
-        ip_alert_counts[ip] += 1
-        ip_alert_types[ip][attack_type] += 1
+        ip_alert_types[alert.client_ip][attack_type] += 1
     
     # Analyze top threats
     top_threats = []
@@ -279,7 +260,7 @@ async def get_top_geo_threats(limit: int = 20):
                 "alert_types": dict(ip_alert_types.get(ip, {})),
                 "threat_score": threat_score,
                 "is_high_risk": threat_score >= 0.7,
-                "last_seen": get_last_seen_time(ip, logs)
+                "last_seen": get_last_seen_time(ip)
             })
     
     # Sort by threat score
@@ -316,35 +297,33 @@ def calculate_threat_score(request_count: int, alert_count: int, alert_types: Di
     # Normalize to 0-1 range
     return min(base_score, 1.0)
 
-def get_last_seen_time(ip: str, logs: List[LogEntry]) -> Optional[str]:
+def get_last_seen_time(ip: str) -> Optional[str]:
     """Get last seen timestamp for IP"""
-    ip_logs = [log for log in logs if hasattr(log, 'client_ip') and log.client_ip == ip]
+    ip_logs = logs_for_ip(ip)
     if ip_logs:
         latest = max(ip_logs, key=lambda x: x.timestamp if hasattr(x, 'timestamp') else datetime.min)
         return latest.timestamp.isoformat() if hasattr(latest, 'timestamp') else None
     return None
 
 @app.get("/api/geoip/heatmap")
+@cached_read
 async def get_geo_heatmap():
     """Get heatmap data for visualization"""
     if not logs_data["parsed_logs"] or not geoip_manager:
         return {"error": "No data or GeoIP database available"}
     
-    logs = logs_data["parsed_logs"]
-    
     # Group by location for heatmap
     location_counts = defaultdict(int)
     
-    for log in logs:
-        if hasattr(log, 'client_ip'):
-            ip = log.client_ip
-            location = geoip_manager.get_location(ip)
-            
-            if location and location.latitude and location.longitude:
-                # Round coordinates for heatmap clustering
-                lat_key = round(location.latitude, 2)
-                lon_key = round(location.longitude, 2)
-                location_counts[(lat_key, lon_key)] += 1
+    # Look up each distinct IP once, weighted by its running request count
+    ip_counts = logs_data["agg"]["ip"]
+    
+    for location, count in zip(geoip_manager.get_locations(list(ip_counts)), ip_counts.values()):
+        if location and location.latitude and location.longitude:
+            # Round coordinates for heatmap clustering
+            lat_key = round(location.latitude, 2)
+            lon_key = round(location.longitude, 2)
+            location_counts[(lat_key, lon_key)] += count
     
     # Convert to heatmap format
     heatmap_data = [
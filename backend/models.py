@@ -1,15 +1,22 @@
 """
 Data models for NGINX Forensics - COMPLETE FIXED VERSION
 """
+from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, NamedTuple, Annotated
+from pydantic import BaseModel, PlainSerializer
 from enum import Enum
 
-class LogEntry(BaseModel):
-    """Parsed NGINX access log entry"""
+@dataclass(slots=True, kw_only=True)
+class LogEntry:
+    """Parsed NGINX access log entry
+    
+    A slotted dataclass rather than a BaseModel: uploads hold millions of these,
+    and the parser already builds every field with its type, so per-entry
+    validation and a __dict__ would only cost time and memory.
+    """
     raw_log: str
-    timestamp: datetime
+    timestamp: Annotated[datetime, PlainSerializer(lambda v: v.isoformat(), return_type=str, when_used='json')]
     client_ip: str
     method: str
     endpoint: str
@@ -22,17 +29,10 @@ class LogEntry(BaseModel):
     host: Optional[str] = None
     request_time: Optional[float] = None
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
-    
-    def dict(self, **kwargs):
-        """Override dict method to ensure datetime serialization - ADD THIS METHOD"""
-        d = super().dict(**kwargs)
-        # Ensure timestamp is properly serialized
-        if 'timestamp' in d and isinstance(d['timestamp'], datetime):
-            d['timestamp'] = d['timestamp'].isoformat()
+    def dict(self, **kwargs) -> Dict[str, Any]:
+        """Fields as a dict with the timestamp ISO formatted, like the models' dict"""
+        d = asdict(self)
+        d['timestamp'] = self.timestamp.isoformat()
         return d
 
 class ErrorLogEntry(BaseModel):
@@ -99,6 +99,18 @@ class AttackAlert(BaseModel):
             d['attack_type'] = d['attack_type'].value
         return d
 
+class RawAlert(NamedTuple):
+    """Alert fields collected during detection, before AttackAlert validation"""
+    log: LogEntry
+    attack_type: AttackType
+    confidence: float
+    details: str
+    
+    @property
+    def client_ip(self) -> str:
+        """Client IP of the log that raised the alert"""
+        return self.log.client_ip
+
 class AggregatedMetrics(BaseModel):
     """Aggregated metrics for dashboard"""
     total_requests: int = 0
@@ -20,4 +20,4 @@ python -m alembic upgrade head
 
 # Start the application
 echo "Starting ForenX-NGINX Sentinel..."
-exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers 4 --log-level info
+exec gunicorn -c gunicorn.conf.py main:app